@@ -0,0 +1,150 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Benchmark_AudioTransport.py - 音频帧传输方式对比
+
+对比同一个 eventlet 服务端上的两种上行通道:
+- socketio: 每包一个 'audio_data' 事件（Socket.IO 包解析 + 二进制附件 + 事件分发）
+- raw-ws:   server.audio_ws 提供的裸 WebSocket，每个二进制消息就是一个音频包
+
+服务端在子进程中运行（与正式服务相同的 eventlet WSGI 服务器，但不加 TLS），
+处理函数只计数；客户端尽快发送 PACKETS 个包，统计服务端吞吐与每包 CPU 耗时。
+
+额外依赖（仅本脚本需要）: python-socketio[client], websocket-client
+"""
+
+import json
+import subprocess
+import sys
+import time
+import urllib.request
+from pathlib import Path
+
+SRC_DIR = Path(__file__).resolve().parent.parent / "src"
+sys.path.insert(0, str(SRC_DIR))
+
+# ==================== 配置区 ====================
+
+PORT = 5099
+
+# 每种通道发送的包数
+PACKETS = 5000
+
+# 包大小：24 字节包头 + 512 个 Int16 样本（"流畅"预设，约 31 包/秒/客户端）
+PACKET_BYTES = 24 + 512 * 2
+
+# ==================== 服务端 ====================
+
+
+def serve():
+    import eventlet
+    eventlet.monkey_patch()
+    import eventlet.wsgi
+    from flask import Flask, jsonify
+    from flask_socketio import SocketIO
+    from server.audio_ws import wrap_audio_ws
+
+    app = Flask(__name__)
+    socketio = SocketIO(app, async_mode='eventlet')
+    stats = {'packets': 0}
+
+    class Engine:
+        def write_audio(self, data, sid=None):
+            stats['packets'] += 1
+
+    class Context:
+        def __init__(self):
+            self.socketio = socketio
+            self.audio_engine = Engine()
+
+        def log(self, msg, level="INFO"):
+            pass
+
+    @socketio.on('audio_data')
+    def handle_audio(data):
+        stats['packets'] += 1
+
+    @app.route('/stats')
+    def get_stats():
+        return jsonify({'packets': stats['packets'], 'cpu': time.process_time()})
+
+    wsgi_app = wrap_audio_ws(Context(), app)
+    eventlet.wsgi.server(eventlet.listen(('127.0.0.1', PORT)), wsgi_app, log_output=False)
+
+
+# ==================== 客户端 ====================
+
+
+def fetch_stats():
+    with urllib.request.urlopen(f"http://127.0.0.1:{PORT}/stats") as resp:
+        return json.loads(resp.read())
+
+
+def wait_for(target, timeout=60):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        stats = fetch_stats()
+        if stats['packets'] >= target:
+            return stats
+        time.sleep(0.05)
+    raise TimeoutError(f"服务端只收到 {fetch_stats()['packets']}/{target} 个包")
+
+
+def run_socketio(sio, payload, base):
+    for _ in range(PACKETS):
+        sio.emit('audio_data', payload)
+    return wait_for(base + PACKETS)
+
+
+def run_raw_ws(sid, payload, base):
+    import websocket
+    ws = websocket.create_connection(f"ws://127.0.0.1:{PORT}/ws/audio?sid={sid}")
+    try:
+        for _ in range(PACKETS):
+            ws.send_binary(payload)
+        return wait_for(base + PACKETS)
+    finally:
+        ws.close()
+
+
+def main():
+    import socketio
+
+    server = subprocess.Popen([sys.executable, __file__, "--serve"], cwd=str(SRC_DIR))
+    try:
+        for _ in range(100):
+            try:
+                fetch_stats()
+                break
+            except OSError:
+                time.sleep(0.1)
+
+        sio = socketio.Client()
+        sio.connect(f"http://127.0.0.1:{PORT}", transports=['websocket'])
+        payload = bytes(PACKET_BYTES)
+
+        print("=" * 64)
+        print(f"音频上行通道基准测试 ({PACKETS} 包 × {PACKET_BYTES} 字节)")
+        print("=" * 64)
+        print(f"{'通道':<12}{'吞吐(包/秒)':>16}{'服务端CPU(µs/包)':>22}")
+        print("-" * 64)
+        for name, runner in (("socketio", lambda b: run_socketio(sio, payload, b)),
+                             ("raw-ws", lambda b: run_raw_ws(sio.get_sid(), payload, b))):
+            before = fetch_stats()
+            start = time.perf_counter()
+            after = runner(before['packets'])
+            elapsed = time.perf_counter() - start
+            cpu_us = (after['cpu'] - before['cpu']) / PACKETS * 1e6
+            print(f"{name:<12}{PACKETS / elapsed:>16.0f}{cpu_us:>22.1f}")
+        print("-" * 64)
+        sio.disconnect()
+    finally:
+        server.terminate()
+        server.wait()
+
+
+if __name__ == "__main__":
+    if "--serve" in sys.argv:
+        serve()
+    else:
+        main()
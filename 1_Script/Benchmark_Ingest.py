@@ -0,0 +1,192 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Benchmark_Ingest.py - 音频接收链路的每包内存分配与耗时对比
+
+第一部分只比较接收与格式转换（同等工作量：录制 + 两路输出缓冲 + 把播放数据交给波形回调）:
+- 旧实现: bytes(data) → frombuffer → clip → *32767 → astype → tobytes，每路输出各自再转一次数组
+- 新实现: AudioEngine.write_audio 处理不带包头的裸 PCM（旧版客户端路径），memoryview 视图 +
+  复用暂存缓冲 + out= 原地运算；两路输出换成与旧实现相同的裸环形缓冲写入，
+  可视化抽头换成与旧实现相同的波形回调，不计入包头解析、丢包补偿、抖动统计与抽头的开销
+
+第二部分是新实现的完整链路（带包头的包），逐项叠加后来加入的功能，
+说明完整链路相对第一部分多出的耗时与内存来自哪里。
+
+统计每包的临时内存峰值（tracemalloc）、由此折算的"包大小倍数"，以及每包耗时。
+录音链路都开启（数据入录音队列，测完丢弃）。
+"""
+
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "src"))
+
+from audio.engine import AudioEngine  # noqa: E402
+from audio.output import RingBuffer  # noqa: E402
+from audio.packet import build_packet  # noqa: E402
+from audio.resampler import PolyphaseResampler  # noqa: E402
+
+# ==================== 配置区 ====================
+
+# (场景名, 是否 Float32 原生模式, 采样率, 每包样本数)
+SCENARIOS = [
+    ("原生 Float32 44.1k/4096", True, 44100, 4096),
+    ("Int16 44.1k/1024", False, 44100, 1024),
+    ("Int16 22.05k/1024 (重采样)", False, 22050, 1024),
+]
+
+PACKETS = 2000
+
+# ==================== 旧实现 ====================
+
+
+class LegacyIngest:
+    """按旧版 write_audio 的写法逐步复现（播放输出用同样的环形缓冲代替声卡）"""
+
+    def __init__(self, float_mode, rate):
+        self.float_mode = float_mode
+        self.resampler = PolyphaseResampler(rate, 44100) if rate != 44100 else None
+        self.record_frames = []
+        self.monitor = RingBuffer(44100 * 2)
+        self.virtual_mic = RingBuffer(44100 * 2)
+
+    def write_audio(self, data):
+        if not isinstance(data, (bytes, bytearray)):
+            data = bytes(data)
+        self.record_frames.append(data)
+        if self.float_mode:
+            float_array = np.frombuffer(data, dtype=np.float32)
+            int16_array = (np.clip(float_array, -1.0, 1.0) * 32767).astype(np.int16)
+            playback_data = int16_array.tobytes()
+        else:
+            playback_data = data
+            if self.resampler is not None:
+                int16_array = np.frombuffer(data, dtype=np.int16, count=len(data) // 2)
+                playback_data = self.resampler.process(int16_array).tobytes()
+        for ring in (self.monitor, self.virtual_mic):
+            ring.write(np.frombuffer(playback_data, dtype=np.int16))
+            ring.clear()
+        waveform_callback(playback_data)
+
+
+def waveform_callback(data):
+    """只读取、不保留数据；界面侧的绘制开销不计入本测试"""
+    if not isinstance(data, np.ndarray):
+        data = np.frombuffer(data, dtype=np.int16)
+    return int(data[-1])
+
+
+# ==================== 新实现 ====================
+
+
+def make_engine(float_mode, rate):
+    engine = AudioEngine(lambda msg, level: None)
+    engine.set_float32_mode(float_mode)
+    if not float_mode:
+        engine.set_input_sample_rate(rate)
+    # 不打开声卡，只让输出缓冲接收数据
+    for output in (engine.monitor_output, engine.virtual_mic_output):
+        output._running = True
+    engine.is_recording = True
+    return engine
+
+
+def drain(engine):
+    engine.record_frames.clear()
+    engine.monitor_output.ring.clear()
+    engine.virtual_mic_output.ring.clear()
+
+
+def make_payloads(float_mode, rate, packet_size):
+    t = np.arange(packet_size) / rate
+    signal = np.sin(2 * np.pi * 440 * t) * 0.5
+    if float_mode:
+        samples = signal.astype(np.float32)
+    else:
+        samples = (signal * 32767).astype(np.int16)
+    return [build_packet(i, i * packet_size * 1000.0 / rate, rate, samples) for i in range(PACKETS)], samples.tobytes()
+
+
+def measure(fn, payloads, after_each):
+    """前 10 包预热，随后 200 包测临时内存，其余测耗时（新实现按包序号去重，包不能重复使用）"""
+    # 预热，排除首次建表/分配暂存缓冲
+    for p in payloads[:10]:
+        fn(p)
+        after_each()
+    tracemalloc.start()
+    total = 0
+    for p in payloads[10:210]:
+        tracemalloc.reset_peak()
+        base = tracemalloc.get_traced_memory()[0]
+        fn(p)
+        total += tracemalloc.get_traced_memory()[1] - base
+        after_each()
+    tracemalloc.stop()
+    peak = total / 200
+
+    timed = payloads[210:]
+    start = time.perf_counter()
+    for p in timed:
+        fn(p)
+        after_each()
+    us = (time.perf_counter() - start) / len(timed) * 1e6
+    return peak, us
+
+
+# 完整链路逐项叠加: (名称, 是否带包头, 是否真实输出通道, 是否真实可视化抽头)
+FULL_STAGES = [
+    ("+ 包头解析/丢包补偿", True, False, False),
+    ("+ 抖动统计/自适应缓冲", True, True, False),
+    ("+ 可视化抽头（完整链路）", True, True, True),
+]
+
+
+def new_engine(float_mode, rate, real_outputs, real_tap):
+    """real_outputs/real_tap 为 False 时换成与旧实现相同的工作量：只写环形缓冲、把数据交给波形回调"""
+    engine = make_engine(float_mode, rate)
+    if not real_outputs:
+        for output in (engine.monitor_output, engine.virtual_mic_output):
+            output.push = output.ring.write
+    if not real_tap:
+        engine.visual_tap.feed = waveform_callback
+    return engine
+
+
+def report(name, label, peak, us, packet_bytes):
+    print(f"{name:<28}{label:<26}{peak / 1024:>12.1f}{peak / packet_bytes:>10.2f}{us:>14.1f}")
+
+
+def main():
+    print("=" * 90)
+    print("音频接收链路基准测试（每包：录制 + 监听 + 虚拟麦克风 + 波形）")
+    print("=" * 90)
+    print(f"{'场景':<28}{'实现':<26}{'临时内存(KB)':>12}{'包大小倍数':>10}{'每包耗时(µs)':>14}")
+    for name, float_mode, rate, packet_size in SCENARIOS:
+        packets, raw = make_payloads(float_mode, rate, packet_size)
+        packet_bytes = len(raw)
+        print("-" * 90)
+
+        legacy = LegacyIngest(float_mode, rate)
+        peak, us = measure(legacy.write_audio, [raw] * PACKETS, legacy.record_frames.clear)
+        report(name, "旧实现", peak, us, packet_bytes)
+
+        # 裸 PCM 不经包序跟踪，可以重复使用同一包
+        engine = new_engine(float_mode, rate, False, False)
+        peak, us = measure(lambda p: engine.write_audio(p), [raw] * PACKETS, lambda: drain(engine))
+        report(name, "新实现（仅接收与转换）", peak, us, packet_bytes)
+        engine.close()
+
+        for label, _, real_outputs, real_tap in FULL_STAGES:
+            engine = new_engine(float_mode, rate, real_outputs, real_tap)
+            peak, us = measure(lambda p: engine.write_audio(p, "bench"), packets, lambda: drain(engine))
+            report(name, label, peak, us, packet_bytes)
+            engine.close()
+    print("-" * 90)
+
+
+if __name__ == "__main__":
+    main()
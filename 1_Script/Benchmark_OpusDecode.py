@@ -0,0 +1,97 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Benchmark_OpusDecode.py - Opus 解码 CPU 开销（每路手机流）
+
+用 opuslib 把测试信号编码成 20ms 的 Opus 包（与手机端 WebCodecs 配置一致），
+再用 audio.codec.OpusStreamDecoder 逐包解码到引擎采样率，分别测 Int16 模式
+（引擎 48k 时直出、44.1k 时重采样）和 Float32 原生模式（重采样到 44.1k）。
+
+输出每包解码耗时、单路流占用的单核 CPU 百分比、单核可承载路数，
+以及相对未压缩 PCM 的上行码率。
+
+依赖: opuslib 及系统 libopus（可选依赖，见 README）
+"""
+
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "src"))
+
+import opuslib  # noqa: E402
+
+from audio.codec import OpusStreamDecoder  # noqa: E402
+from config import OPUS_SAMPLE_RATE, RATE  # noqa: E402
+
+# ==================== 配置区 ====================
+
+BITRATES = [24000, 32000, 64000, 128000]
+
+# 每包时长（毫秒）与测试包数（3000 包 = 60 秒音频）
+FRAME_MS = 20
+PACKETS = 3000
+
+# (路径名, 是否 Float32 模式, 引擎采样率)
+PATHS = [
+    ("Int16 48k", False, OPUS_SAMPLE_RATE),
+    ("Int16 44.1k", False, RATE),
+    ("Float32 44.1k", True, RATE),
+]
+
+# 对照：未压缩 PCM 上行码率（bit/s）
+PCM_REFERENCE = {
+    "Int16 22.05k": 22050 * 16,
+    "Float32 44.1k": 44100 * 32,
+}
+
+# ==================== 功能函数 ====================
+
+
+def make_signal(seconds):
+    """语音频段的多音 + 噪声测试信号"""
+    t = np.arange(int(OPUS_SAMPLE_RATE * seconds)) / OPUS_SAMPLE_RATE
+    signal = 0.3 * np.sin(2 * np.pi * 220 * t) + 0.2 * np.sin(2 * np.pi * 1250 * t)
+    signal += 0.05 * np.random.default_rng(0).standard_normal(len(t))
+    return np.clip(signal, -1, 1).astype(np.float32)
+
+
+def encode_packets(signal, bitrate):
+    frame = OPUS_SAMPLE_RATE * FRAME_MS // 1000
+    encoder = opuslib.Encoder(OPUS_SAMPLE_RATE, 1, 'audio')
+    encoder.bitrate = bitrate
+    return [encoder.encode_float(signal[i:i + frame].tobytes(), frame)
+            for i in range(0, len(signal) - frame + 1, frame)]
+
+
+def time_decode(packets, float_mode, rate):
+    decoder = OpusStreamDecoder()
+    start = time.process_time()
+    for p in packets:
+        decoder.decode(p, float_mode, rate)
+    return (time.process_time() - start) / len(packets) * 1e6
+
+
+def main():
+    signal = make_signal(PACKETS * FRAME_MS / 1000)
+    print("=" * 84)
+    print(f"Opus 解码基准测试 ({PACKETS} 包 × {FRAME_MS}ms, 单声道 48kHz)")
+    print("=" * 84)
+    print(f"{'码率':<10}{'实测码率(kbps)':>16}{'路径':>16}{'每包(µs)':>12}{'单路CPU(%)':>14}{'单核路数':>12}")
+    print("-" * 84)
+    for bitrate in BITRATES:
+        packets = encode_packets(signal, bitrate)
+        actual_kbps = sum(len(p) for p in packets) * 8 / (len(packets) * FRAME_MS / 1000) / 1000
+        for label, float_mode, rate in PATHS:
+            us = time_decode(packets, float_mode, rate)
+            cpu = us / (FRAME_MS * 1000) * 100
+            print(f"{bitrate // 1000:<10}{actual_kbps:>16.1f}{label:>16}{us:>12.1f}{cpu:>14.2f}{100 / cpu:>12.0f}")
+    print("-" * 84)
+    for name, bps in PCM_REFERENCE.items():
+        print(f"对照 PCM {name}: {bps / 1000:.0f} kbps")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Benchmark_PlayRange.py - 手机端播放 Float32 录音：整段转换 vs 按字节区间转码
+
+对一个 1 小时 48kHz 单声道 Float32 WAV，测量浏览器一次请求的耗时与峰值内存（tracemalloc）:
+- 旧实现: 整段读入 → 转 Int16 → 写入 BytesIO → 一次性返回（每次拖动进度条都重复）
+- 新实现: audio.transcode.Int16Rendition，只换算 Range 覆盖到的样本
+  · 拖动到中间: 浏览器请求 "bytes=<中点>-" 后通常只读取开头约 1MB 就开始播放
+  · 从头完整播放: 逐块生成整个文件（峰值内存只与块大小有关）
+"""
+
+import io
+import os
+import struct
+import sys
+import tempfile
+import time
+import tracemalloc
+import wave
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "src"))
+
+from audio.transcode import Int16Rendition  # noqa: E402
+from audio.wavfile import read_wav_info, memmap_samples  # noqa: E402
+
+# ==================== 配置区 ====================
+
+SECONDS = 3600
+SAMPLE_RATE = 48000
+# 拖动后浏览器实际读取的字节数
+SEEK_READ_BYTES = 1 << 20
+
+# ==================== 功能函数 ====================
+
+
+def make_float_wav(path):
+    frames = SECONDS * SAMPLE_RATE
+    header = struct.pack('<4sI4s4sIHHIIHH4sI', b'RIFF', 36 + frames * 4, b'WAVE', b'fmt ', 16, 3, 1,
+                         SAMPLE_RATE, SAMPLE_RATE * 4, 4, 32, b'data', frames * 4)
+    rng = np.random.default_rng(0)
+    with open(path, 'wb') as f:
+        f.write(header)
+        for _ in range(SECONDS // 60):
+            f.write((rng.standard_normal(SAMPLE_RATE * 60) * 0.1).astype('<f4').tobytes())
+
+
+def legacy(path):
+    """旧版 _convert_float32_to_int16 + buf.read()"""
+    info = read_wav_info(path)
+    samples = memmap_samples(path, info)
+    int16_array = (np.clip(samples, -1.0, 1.0) * 32767).astype(np.int16)
+    buf = io.BytesIO()
+    with wave.open(buf, 'wb') as wf:
+        wf.setnchannels(info.channels)
+        wf.setsampwidth(2)
+        wf.setframerate(info.sample_rate)
+        wf.writeframes(int16_array.tobytes())
+    buf.seek(0)
+    return len(buf.read())
+
+
+def seek_middle(path):
+    rendition = Int16Rendition(path)
+    start = rendition.size // 2
+    read = 0
+    for chunk in rendition.iter_range(start, rendition.size):
+        read += len(chunk)
+        if read >= SEEK_READ_BYTES:
+            break
+    return read
+
+
+def stream_all(path):
+    rendition = Int16Rendition(path)
+    return sum(len(chunk) for chunk in rendition.iter_range(0, rendition.size))
+
+
+def measure(fn, path):
+    tracemalloc.start()
+    start = time.perf_counter()
+    fn(path)
+    elapsed = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return elapsed, peak
+
+
+def main():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "REC_bench_32bit.wav")
+        make_float_wav(path)
+        print("=" * 64)
+        print(f"Float32 播放请求基准测试（{SECONDS / 3600:g} 小时, {os.path.getsize(path) / 1024 / 1024:.0f} MB）")
+        print("=" * 64)
+        print(f"{'情况':<26}{'耗时(ms)':>14}{'峰值内存(MB)':>16}")
+        print("-" * 64)
+        for label, fn in (("旧实现（每次整段转换）", legacy),
+                          ("区间转码：拖动到中间", seek_middle),
+                          ("区间转码：从头完整播放", stream_all)):
+            elapsed, peak = measure(fn, path)
+            print(f"{label:<26}{elapsed * 1000:>14.1f}{peak / 1024 / 1024:>16.1f}")
+        print("-" * 64)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Benchmark_RealtimeWaveform.py - 实时波形历史缓冲的每包开销与历史时长的关系
+
+对比两种实现在不同历史时长下处理一包数据的耗时:
+- 旧实现: 全采样率 float64 缓冲，每包 np.roll 整段平移后写入尾部
+- 新实现: VisualTap 抽取包络 + RealtimeWaveformVisualizer 的 float32 环形缓冲
+  （按最坏情况每包都取一次抽头，界面实际约 33ms 才取一次）
+
+另测新实现每帧按时间顺序读出历史（两段拷贝）的耗时，供参考。
+需要 PySide6 与 pyqtgraph，无显示环境时自动使用 offscreen 平台。
+"""
+
+import os
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "src"))
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+from PySide6.QtWidgets import QApplication  # noqa: E402
+
+from audio.tap import VisualTap  # noqa: E402
+from config import RATE  # noqa: E402
+from ui.realtime_waveform import RealtimeWaveformVisualizer  # noqa: E402
+
+# ==================== 配置区 ====================
+
+# 历史时长（秒）—— 界面下拉框可选值及更长的极端情况
+DURATIONS = [10, 30, 60, 300]
+
+PACKET_SIZE = 1024
+PACKETS = 300
+
+# 每帧读取测试次数
+FRAMES = 100
+
+# ==================== 功能函数 ====================
+
+
+def make_packets():
+    t = np.arange(PACKET_SIZE * PACKETS) / RATE
+    signal = (np.sin(2 * np.pi * 440 * t) * 16000).astype(np.int16)
+    return signal.reshape(PACKETS, PACKET_SIZE)
+
+
+def legacy_per_packet(packets, duration):
+    """按旧版 update_data 的写法复现"""
+    buffer_size = RATE * duration
+    buffer = np.zeros(buffer_size)
+    start = time.perf_counter()
+    for p in packets:
+        audio_array = np.multiply(p, 1.0 / 32768, dtype=np.float32)
+        shift = len(audio_array)
+        buffer = np.roll(buffer, -shift)
+        buffer[-shift:] = audio_array
+    return (time.perf_counter() - start) / len(packets) * 1e6
+
+
+def ring_per_packet(packets, duration):
+    widget = RealtimeWaveformVisualizer(duration_seconds=duration)
+    tap = VisualTap()
+    widget.attach_tap(tap)
+    start = time.perf_counter()
+    for p in packets:
+        tap.feed(p)
+        widget._pull_tap()
+    us = (time.perf_counter() - start) / len(packets) * 1e6
+
+    start = time.perf_counter()
+    for _ in range(FRAMES):
+        widget._ordered()
+    frame_us = (time.perf_counter() - start) / FRAMES * 1e6
+    widget.deleteLater()
+    return us, frame_us
+
+
+def main():
+    app = QApplication.instance() or QApplication(sys.argv)  # noqa: F841
+    packets = make_packets()
+    print("=" * 78)
+    print(f"实时波形历史缓冲基准测试（每包 {PACKET_SIZE} 样本 @ {RATE} Hz）")
+    print("=" * 78)
+    print(f"{'历史时长':<10}{'旧实现 每包(µs)':>18}{'新实现 每包(µs)':>18}{'新实现 每帧读取(µs)':>22}")
+    print("-" * 78)
+    for duration in DURATIONS:
+        legacy_us = legacy_per_packet(packets, duration)
+        ring_us, frame_us = ring_per_packet(packets, duration)
+        print(f"{duration:>6}s   {legacy_us:>18.1f}{ring_us:>18.1f}{frame_us:>22.1f}")
+    print("-" * 78)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Benchmark_Resampler.py - 重采样性能与块边界质量对比
+
+对比两种实现在手机端各质量预设（16k/22.05k/32k → 44.1k）下的表现:
+- 旧实现: 每包 np.linspace + np.interp，包之间无状态
+- 新实现: audio.resampler.PolyphaseResampler，跨包保留滤波历史
+
+输出每包耗时、每包临时内存峰值，以及拼接后相对整段处理的块边界误差。
+"""
+
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "src"))
+
+from audio.resampler import PolyphaseResampler  # noqa: E402
+
+# ==================== 配置区 ====================
+
+TARGET_RATE = 44100
+
+# (输入采样率, 每包样本数) —— 与 web/index.html 中的质量预设对应
+PRESETS = [
+    (16000, 512),
+    (22050, 1024),
+    (32000, 2048),
+]
+
+# 每个预设测试的包数
+PACKETS = 2000
+
+# ==================== 功能函数 ====================
+
+
+def legacy_resample(int16_array, in_rate, out_rate):
+    """旧版 write_audio 中的逐包线性插值"""
+    num_samples = len(int16_array)
+    new_num_samples = int(num_samples * out_rate / in_rate)
+    x_old = np.linspace(0, 1, num_samples)
+    x_new = np.linspace(0, 1, new_num_samples)
+    resampled = np.interp(x_new, x_old, int16_array)
+    return np.clip(resampled, -32768, 32767).astype(np.int16)
+
+
+def make_packets(in_rate, packet_size, count):
+    t = np.arange(packet_size * count) / in_rate
+    signal = (np.sin(2 * np.pi * 440 * t) * 12000).astype(np.int16)
+    return [signal[i * packet_size:(i + 1) * packet_size] for i in range(count)]
+
+
+def time_per_packet(fn, packets):
+    start = time.perf_counter()
+    for p in packets:
+        fn(p)
+    return (time.perf_counter() - start) / len(packets) * 1e6
+
+
+def transient_bytes_per_packet(fn, packets):
+    """每包处理过程中临时申请的内存峰值（字节）"""
+    # 预热一轮，排除首次建表
+    for p in packets[:10]:
+        fn(p)
+    tracemalloc.start()
+    total = 0
+    for p in packets[:200]:
+        tracemalloc.reset_peak()
+        base = tracemalloc.get_traced_memory()[0]
+        fn(p)
+        total += tracemalloc.get_traced_memory()[1] - base
+    tracemalloc.stop()
+    return total / 200
+
+
+def boundary_error(in_rate, packets):
+    """逐包处理与整段处理的最大差值（线性插值在包边界会产生跳变）"""
+    whole = np.concatenate(packets)
+    legacy_chunks = np.concatenate([legacy_resample(p, in_rate, TARGET_RATE) for p in packets])
+    legacy_whole = legacy_resample(whole, in_rate, TARGET_RATE)
+    n = min(len(legacy_chunks), len(legacy_whole))
+    legacy_err = np.abs(legacy_chunks[:n].astype(np.int32) - legacy_whole[:n]).max()
+
+    r1 = PolyphaseResampler(in_rate, TARGET_RATE)
+    poly_chunks = np.concatenate([r1.process(p).copy() for p in packets])
+    poly_whole = PolyphaseResampler(in_rate, TARGET_RATE).process(whole).copy()
+    n = min(len(poly_chunks), len(poly_whole))
+    poly_err = np.abs(poly_chunks[:n].astype(np.int32) - poly_whole[:n]).max()
+    return legacy_err, poly_err
+
+
+def main():
+    print("=" * 80)
+    print("重采样基准测试 (→ 44.1 kHz)")
+    print("=" * 80)
+    print(f"{'预设':<16}{'实现':<12}{'每包耗时(µs)':>14}{'临时内存(KB)':>14}{'边界误差':>12}")
+    print("-" * 80)
+    for in_rate, packet_size in PRESETS:
+        packets = make_packets(in_rate, packet_size, PACKETS)
+        label = f"{in_rate / 1000:g}k/{packet_size}"
+        legacy_err, poly_err = boundary_error(in_rate, packets[:50])
+
+        legacy_fn = lambda p: legacy_resample(p, in_rate, TARGET_RATE)  # noqa: E731
+        resampler = PolyphaseResampler(in_rate, TARGET_RATE)
+        poly_fn = resampler.process
+
+        for name, fn, err in (("linspace", legacy_fn, legacy_err), ("polyphase", poly_fn, poly_err)):
+            us = time_per_packet(fn, packets)
+            transient_kb = transient_bytes_per_packet(fn, packets) / 1024
+            print(f"{label:<16}{name:<12}{us:>14.1f}{transient_kb:>14.1f}{err:>12d}")
+    print("-" * 80)
+
+
+if __name__ == "__main__":
+    main()
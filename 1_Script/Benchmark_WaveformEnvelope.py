@@ -0,0 +1,137 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Benchmark_WaveformEnvelope.py - 波形显示降采样的耗时与瞬态保留对比
+
+录音波形（1 小时 44.1kHz 单声道，已载入内存的 float32 数据）:
+- 旧实现: data[::factor] 按步长抽点
+- 新实现: ui.envelope.minmax_envelope，reshape 一次归约出每组 min/max
+
+实时波形（每帧对历史包络降到 2000 点，~30fps）:
+- 旧实现: Python 循环 2000 次切片，奇偶点交替取 max/min
+- 新实现: 同一个 minmax_envelope，上下沿分别归约
+
+瞬态保留：在静音底噪里随机放入若干 1ms 的脉冲，统计降采样结果中
+能看到（幅度超过脉冲一半）的脉冲个数。
+需要 pyqtgraph（envelope 模块同时提供绘制辅助函数）。
+"""
+
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "src"))
+
+from config import RATE, TAP_DECIMATION  # noqa: E402
+from ui.envelope import minmax_envelope  # noqa: E402
+
+# ==================== 配置区 ====================
+
+FILE_SECONDS = 3600
+FILE_POINTS = 10000
+
+# 实时波形：历史时长（秒）与显示点数
+REALTIME_SECONDS = [10, 30]
+REALTIME_POINTS = 2000
+REALTIME_FRAMES = 30
+
+# 脉冲个数、幅度、时长（样本）
+CLICKS = 50
+CLICK_LEVEL = 0.8
+CLICK_SAMPLES = RATE // 1000
+
+REPEAT = 3
+
+# ==================== 功能函数 ====================
+
+
+def make_recording(seconds, rng):
+    data = (rng.standard_normal(int(seconds * RATE), dtype=np.float32) * 0.01)
+    starts = np.sort(rng.choice(len(data) - CLICK_SAMPLES, CLICKS, replace=False))
+    for s in starts:
+        data[s:s + CLICK_SAMPLES] = CLICK_LEVEL
+    return data, starts
+
+
+def visible_clicks(values, starts, samples_per_point):
+    """脉冲所在显示点的幅度超过一半即算可见"""
+    idx = np.minimum(starts // samples_per_point, len(values) - 1)
+    return int(np.count_nonzero(np.abs(values[idx]) > CLICK_LEVEL / 2))
+
+
+def best_time(fn):
+    best = float("inf")
+    for _ in range(REPEAT):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def legacy_realtime(data, points):
+    """旧版 _downsample_for_display"""
+    if len(data) <= points:
+        return data
+    chunk_size = len(data) // points
+    result = np.empty(points)
+    for i in range(points):
+        start = i * chunk_size
+        end = start + chunk_size
+        chunk = data[start:end]
+        if len(chunk) > 0:
+            result[i] = np.max(chunk) if i % 2 == 0 else np.min(chunk)
+        else:
+            result[i] = 0
+    return result
+
+
+def bench_file(rng):
+    data, starts = make_recording(FILE_SECONDS, rng)
+    print(f"录音波形: {FILE_SECONDS / 3600:g} 小时, {len(data) / 1e6:.1f}M 样本 → {FILE_POINTS} 点")
+    print(f"{'实现':<14}{'耗时(ms)':>12}{'可见脉冲':>12}")
+
+    factor = max(1, len(data) // FILE_POINTS)
+    t, strided = best_time(lambda: data[::factor].copy())
+    print(f"{'步长抽点':<14}{t * 1000:>12.1f}{visible_clicks(strided, starts, factor):>9}/{CLICKS}")
+
+    t, (mins, maxs, bucket) = best_time(lambda: minmax_envelope(data, FILE_POINTS))
+    shown = np.where(np.abs(maxs) > np.abs(mins), maxs, mins)
+    print(f"{'min/max 包络':<14}{t * 1000:>12.1f}{visible_clicks(shown, starts, bucket):>9}/{CLICKS}")
+
+
+def bench_realtime(rng):
+    print(f"实时波形: 每帧 → {REALTIME_POINTS} 点（历史为抽头包络，每组 {TAP_DECIMATION} 样本）")
+    print(f"{'历史时长':<10}{'实现':<14}{'每帧(ms)':>12}{'占 33ms 帧(%)':>16}")
+    for seconds in REALTIME_SECONDS:
+        rows = rng.standard_normal((int(seconds * RATE / TAP_DECIMATION), 2)).astype(np.float32)
+        rows[:, 0] = np.abs(rows[:, 0])
+        rows[:, 1] = -np.abs(rows[:, 1])
+        interleaved = rows.ravel()
+
+        def frames(fn):
+            start = time.perf_counter()
+            for _ in range(REALTIME_FRAMES):
+                fn()
+            return (time.perf_counter() - start) / REALTIME_FRAMES
+
+        legacy = frames(lambda: legacy_realtime(interleaved, REALTIME_POINTS))
+        new = frames(lambda: minmax_envelope(rows[:, 1], REALTIME_POINTS, hi=rows[:, 0]))
+        for name, t in (("循环交替", legacy), ("min/max 包络", new)):
+            print(f"{seconds:>6}s   {name:<14}{t * 1000:>12.2f}{t / 0.033 * 100:>16.1f}")
+
+
+def main():
+    rng = np.random.default_rng(0)
+    print("=" * 60)
+    print("波形包络降采样基准测试")
+    print("=" * 60)
+    bench_file(rng)
+    print("-" * 60)
+    bench_realtime(rng)
+    print("-" * 60)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,4 +1,8 @@
 from .engine import AudioEngine
 from .player import AudioPlayer
+from .recorder import StreamingWavWriter, MultitrackRecorder, recover_recordings
+from .catalog import RecordingCatalog
+from .transcode import TranscodeCache
 
-__all__ = ["AudioEngine", "AudioPlayer"]
+__all__ = ["AudioEngine", "AudioPlayer", "StreamingWavWriter", "MultitrackRecorder", "recover_recordings", "RecordingCatalog",
+           "TranscodeCache"]
@@ -0,0 +1,173 @@
+"""录音目录索引 - 把每个 WAV 的大小、修改时间、时长、格式与峰值存入录音目录下的 SQLite 文件。
+
+文件列表（手机端 /api/audio/list 与桌面端文件树）只需 scandir 一次比对 (大小, mtime_ns)，
+未变化的文件不再打开；新增或被改写的文件才解析文件头，保存/删除时增量更新。
+"""
+
+import hashlib
+import os
+import sqlite3
+import threading
+from collections import namedtuple
+from pathlib import Path
+
+from config import CATALOG_FILE_NAME
+from .peaks import load_peaks
+from .wavfile import wav_info
+
+# 表结构变化时递增，旧索引整表重建
+CATALOG_VERSION = 1
+
+_COLUMNS = ('name', 'size', 'mtime_ns', 'duration', 'format', 'sample_rate', 'channels', 'peak')
+
+
+class CatalogEntry(namedtuple('CatalogEntry', _COLUMNS)):
+    """一条录音记录；format 形如 int16/float32，无法解析时为 None；peak 为满幅比例，无旁路文件时为 None"""
+    __slots__ = ()
+
+    @property
+    def mtime(self):
+        return self.mtime_ns / 1e9
+
+
+def _peak_of(path):
+    """由峰值旁路文件得到整段峰值；没有有效旁路文件时返回 None"""
+    pyramid = load_peaks(path)
+    return None if pyramid is None else pyramid.peak
+
+
+def _scan_entry(path, st):
+    try:
+        info = wav_info(path)
+        return CatalogEntry(path.name, st.st_size, st.st_mtime_ns, info.duration, info.format_name,
+                            info.sample_rate, info.channels, _peak_of(path))
+    except (OSError, ValueError):
+        # 损坏的文件同样记下大小与修改时间，未变化前不再重复解析
+        return CatalogEntry(path.name, st.st_size, st.st_mtime_ns, 0, None, 0, 0, None)
+
+
+class RecordingCatalog:
+    """录音目录的持久化索引，内存中保留一份副本；Qt 主线程与服务线程共用，内部加锁"""
+
+    def __init__(self, record_dir, log_callback=None):
+        self.log = log_callback or (lambda msg, level="INFO": None)
+        self._lock = threading.Lock()
+        self._db = None
+        self._entries = {}
+        self._state = None
+        self.set_directory(record_dir)
+
+    def set_directory(self, record_dir):
+        """切换录音目录：打开（必要时新建）该目录下的索引文件并载入内存"""
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+            self.record_dir = Path(record_dir)
+            self._db = self._open(self.record_dir / CATALOG_FILE_NAME)
+            rows = self._db.execute(f"SELECT {', '.join(_COLUMNS)} FROM recordings").fetchall()
+            self._entries = {row[0]: CatalogEntry(*row) for row in rows}
+            self._state = None
+
+    def _open(self, db_path):
+        try:
+            return self._connect(db_path)
+        except sqlite3.DatabaseError as e:
+            # 索引损坏或目录不可写：删掉重建，仍失败则只在内存中维护
+            self.log(f"录音索引不可用，重新建立: {e}", "WARNING")
+            try:
+                db_path.unlink()
+                return self._connect(db_path)
+            except (OSError, sqlite3.DatabaseError):
+                return self._connect(':memory:')
+
+    @staticmethod
+    def _connect(db_path):
+        db = sqlite3.connect(str(db_path), check_same_thread=False)
+        if db.execute("PRAGMA user_version").fetchone()[0] != CATALOG_VERSION:
+            db.execute("DROP TABLE IF EXISTS recordings")
+            db.execute(f"PRAGMA user_version = {CATALOG_VERSION}")
+        db.execute("""CREATE TABLE IF NOT EXISTS recordings (
+            name TEXT PRIMARY KEY, size INTEGER, mtime_ns INTEGER, duration REAL,
+            format TEXT, sample_rate INTEGER, channels INTEGER, peak REAL)""")
+        db.commit()
+        return db
+
+    def _store(self, changed, removed):
+        """调用方持有锁；只写变化的行，一次事务提交"""
+        if not changed and not removed:
+            return
+        try:
+            with self._db:
+                self._db.executemany(f"INSERT OR REPLACE INTO recordings VALUES ({', '.join('?' * len(_COLUMNS))})",
+                                     changed)
+                self._db.executemany("DELETE FROM recordings WHERE name = ?", [(name,) for name in removed])
+        except sqlite3.Error as e:
+            # 写盘失败不影响本次列表，内存副本照常更新，下次启动重新比对
+            self.log(f"录音索引写入失败: {e}", "WARNING")
+
+    def refresh(self):
+        """与目录比对：只 stat 不打开文件，(大小, mtime_ns) 变化或新增的文件才解析文件头"""
+        with self._lock:
+            seen = set()
+            changed = []
+            with os.scandir(self.record_dir) as it:
+                for item in it:
+                    if not item.name.lower().endswith('.wav') or not item.is_file():
+                        continue
+                    st = item.stat()
+                    seen.add(item.name)
+                    old = self._entries.get(item.name)
+                    if old is None or old.size != st.st_size or old.mtime_ns != st.st_mtime_ns:
+                        entry = _scan_entry(Path(item.path), st)
+                        self._entries[item.name] = entry
+                        changed.append(entry)
+            removed = [name for name in self._entries if name not in seen]
+            for name in removed:
+                del self._entries[name]
+            if changed or removed:
+                self._state = None
+            self._store(changed, removed)
+
+    def entries(self):
+        """比对目录后返回全部记录，按修改时间从新到旧"""
+        self.refresh()
+        with self._lock:
+            return sorted(self._entries.values(), key=lambda e: e.mtime_ns, reverse=True)
+
+    def update(self, path):
+        """保存录音后调用：立即写入该文件的记录（此时峰值旁路文件已生成）"""
+        path = Path(path)
+        try:
+            st = path.stat()
+        except OSError:
+            return self.remove(path.name)
+        entry = _scan_entry(path, st)
+        with self._lock:
+            self._entries[entry.name] = entry
+            self._state = None
+            self._store([entry], [])
+        return entry
+
+    def remove(self, name):
+        with self._lock:
+            if self._entries.pop(name, None) is not None:
+                self._state = None
+                self._store([], [name])
+
+    @property
+    def state(self):
+        """目录状态摘要（目录 + 各文件 名称/大小/mtime_ns），任何文件变化都会改变；用作列表的 ETag"""
+        with self._lock:
+            if self._state is None:
+                digest = hashlib.blake2b(str(self.record_dir).encode(), digest_size=12)
+                for name in sorted(self._entries):
+                    entry = self._entries[name]
+                    digest.update(f"\0{name}\0{entry.size}\0{entry.mtime_ns}".encode())
+                self._state = digest.hexdigest()
+            return self._state
+
+    def close(self):
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
@@ -0,0 +1,44 @@
+"""Opus 解码 - 手机端用 WebCodecs 编码，服务端解码回现有 Int16/Float32 链路（opuslib 为可选依赖）"""
+
+import numpy as np
+
+from config import RATE, OPUS_SAMPLE_RATE
+from .resampler import PolyphaseResampler
+
+try:
+    import opuslib
+    OPUS_AVAILABLE = True
+except Exception:
+    # opuslib 未安装或找不到 libopus 动态库
+    opuslib = None
+    OPUS_AVAILABLE = False
+
+# 单个 Opus 包最长 120ms
+_MAX_FRAME_SIZE = OPUS_SAMPLE_RATE * 120 // 1000
+
+
+class OpusStreamDecoder:
+    """单个客户端的 Opus 解码状态（解码器内部有跨包预测，每个客户端必须各用一个）。
+
+    解码得到 48kHz 的 Int16 或 Float32，在此用该客户端专用的多相重采样器
+    转换到引擎采样率后返回，Opus 客户端不会改变引擎采样率。
+    """
+
+    def __init__(self):
+        self._decoder = opuslib.Decoder(OPUS_SAMPLE_RATE, 1)
+        self._resampler = None
+
+    def decode(self, payload, float_mode, out_rate=RATE):
+        """返回 (样本数组, 采样率)；out_rate 为引擎当前采样率"""
+        data = bytes(payload)
+        if float_mode:
+            pcm = np.frombuffer(self._decoder.decode_float(data, _MAX_FRAME_SIZE), dtype=np.float32)
+        else:
+            pcm = np.frombuffer(self._decoder.decode(data, _MAX_FRAME_SIZE), dtype=np.int16)
+        if out_rate == OPUS_SAMPLE_RATE:
+            return pcm, out_rate
+        resampler = self._resampler
+        if resampler is None or resampler.out_rate != out_rate or resampler.dtype != pcm.dtype:
+            resampler = self._resampler = PolyphaseResampler(OPUS_SAMPLE_RATE, out_rate, dtype=pcm.dtype)
+        # 重采样结果是内部缓冲视图，下游会继续持有，这里复制一份
+        return resampler.process(pcm).copy(), out_rate
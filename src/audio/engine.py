@@ -1,26 +1,60 @@
 """音频处理引擎 - 支持 Int16 和 Float32 双格式，双输出设备（监听+虚拟麦克风）"""
 
+import math
+import os
 import wave
 import threading
 import numpy as np
 import pyaudio
 
-from config import CHUNK, FORMAT, FORMAT_FLOAT32, CHANNELS, RATE
+from config import (FORMAT, FORMAT_FLOAT32, CHANNELS, RATE, RECORD_STREAM_TO_DISK, RECORD_MULTITRACK,
+                    RECORD_PEAKS, MIX_GAIN_MAX)
+from .recorder import StreamingWavWriter, MultitrackRecorder
+from .output import OutputChannel
+from .resampler import PolyphaseResampler
+from .mixer import AudioMixer
+from .packet import parse_packet, PacketStream, PACKET_FORMAT_INT16, PACKET_FORMAT_FLOAT32
+from .codec import OpusStreamDecoder, OPUS_AVAILABLE
+from .tap import VisualTap
+from .peaks import build_peaks, save_peaks, remove_peaks
+
+
+def _float_to_int16(samples, out, scratch=None):
+    """Float32 [-1, 1] → Int16 写入 out；scratch 为同长度的 Float32 暂存，缺省时临时分配"""
+    if scratch is None:
+        scratch = np.empty(len(samples), dtype=np.float32)
+    np.clip(samples, -1.0, 1.0, out=scratch)
+    np.multiply(scratch, 32767, out=scratch)
+    np.copyto(out, scratch, casting='unsafe')
+    return out
+
+
+def _byte_view(samples):
+    """数组的字节视图（不复制），供录音写入与 b''.join"""
+    return memoryview(samples).cast('B')
 
 
 class AudioEngine:
     def __init__(self, log_callback):
         self.pa = pyaudio.PyAudio()
-        self.monitor_stream = None
-        self.virtual_mic_stream = None
         self.lock = threading.Lock()
         self.log = log_callback
+
+        # 双输出：各自的环形缓冲 + 输出线程，网络线程只负责入缓冲
+        self.monitor_output = OutputChannel(self.pa, "monitor", log_callback)
+        self.virtual_mic_output = OutputChannel(self.pa, "virtual_mic", log_callback)
         self.is_recording = False
         self.record_frames = []
 
-        # 双设备索引
-        self.monitor_device_index = None
-        self.virtual_mic_device_index = None
+        # 流式录音：边收边写盘，停止时只需回填文件头
+        self.record_to_disk = RECORD_STREAM_TO_DISK
+        self.record_writer = None
+        self.last_saved_path = None
+
+        # 分轨录音：每个客户端另存一个音轨
+        self.record_multitrack = RECORD_MULTITRACK
+        self.track_recorder = None
+        self.last_track_paths = []
 
         # 播放控制
         self.enable_monitor_playback = True
@@ -35,15 +69,31 @@ class AudioEngine:
         # 采样率控制
         self.target_sample_rate = RATE
         self.input_sample_rate = RATE
-        self.resample_state = None
-
-        # 实时波形更新回调
-        self.waveform_callback = None
+        self.resampler = None
+
+        # 实时波形/电平表的数据抽头（界面定时读取，不在音频线程里回调界面）
+        self.visual_tap = VisualTap()
+
+        # 多客户端混音：混音线程与网络线程可能同时分发，分发过程串行化
+        self.mixer = AudioMixer(self._on_mixed_block, log_callback)
+        self._dispatch_lock = threading.Lock()
+        # 分发用的复用暂存缓冲（Float32→Int16 播放转换），由 _dispatch_lock 保护
+        self._scratch_i16 = np.empty(0, dtype=np.int16)
+        self._scratch_f32 = np.empty(0, dtype=np.float32)
+
+        # 带包头的音频包：每个客户端一份序号跟踪/丢包补偿状态
+        self._packet_streams = {}
+        # Opus 压缩传输：每个客户端一个解码器
+        self._opus_decoders = {}
+        # 已记录过异常包的客户端，同一客户端只记一次日志
+        self._bad_packet_sids = set()
+        self._client_codecs = {}
 
     def set_input_sample_rate(self, rate):
         if rate != self.input_sample_rate:
             self.input_sample_rate = rate
-            self.resample_state = None
+            self.resampler = None
+            self.mixer.set_rate(rate)
             self.log(f"输入采样率调整为: {rate} Hz", "INFO")
 
     def set_float32_mode(self, enabled):
@@ -53,6 +103,7 @@ class AudioEngine:
         if enabled:
             self.recording_format = FORMAT_FLOAT32
             self.input_sample_rate = RATE  # 原生模式固定 44100Hz
+            self.mixer.set_rate(RATE)
             self.log("已切换到 Float32 高音质模式 (录制: Float32, 播放: Int16)", "SUCCESS")
         else:
             self.recording_format = FORMAT
@@ -75,147 +126,333 @@ class AudioEngine:
         return devices
 
     def start_monitor_stream(self, device_index):
-        self.stop_monitor_stream()
-        with self.lock:
-            try:
-                self.monitor_stream = self.pa.open(
-                    format=FORMAT, channels=CHANNELS, rate=RATE,
-                    output=True, output_device_index=device_index,
-                    frames_per_buffer=CHUNK
-                )
-                self.monitor_device_index = device_index
-                self.log(f"成功开启监听流 (设备ID: {device_index})", "INFO")
-                return True
-            except Exception as e:
-                self.log(f"开启监听流失败: {e}", "ERROR")
-                return False
+        return self._open_output(self.monitor_output, device_index, "监听流")
 
     def stop_monitor_stream(self):
-        with self.lock:
-            if self.monitor_stream:
-                try:
-                    self.monitor_stream.stop_stream()
-                    self.monitor_stream.close()
-                except:
-                    pass
-                self.monitor_stream = None
-                self.log("监听流已关闭", "INFO")
+        self._close_output(self.monitor_output, "监听流")
 
     def start_virtual_mic_stream(self, device_index):
-        self.stop_virtual_mic_stream()
+        return self._open_output(self.virtual_mic_output, device_index, "虚拟麦克风流")
+
+    def stop_virtual_mic_stream(self):
+        self._close_output(self.virtual_mic_output, "虚拟麦克风流")
+
+    def _open_output(self, output, device_index, label):
         with self.lock:
             try:
-                self.virtual_mic_stream = self.pa.open(
-                    format=FORMAT, channels=CHANNELS, rate=RATE,
-                    output=True, output_device_index=device_index,
-                    frames_per_buffer=CHUNK
-                )
-                self.virtual_mic_device_index = device_index
-                self.log(f"成功开启虚拟麦克风流 (设备ID: {device_index})", "INFO")
+                output.open(device_index)
+                self.log(f"成功开启{label} (设备ID: {device_index})", "INFO")
                 return True
             except Exception as e:
-                self.log(f"开启虚拟麦克风流失败: {e}", "ERROR")
+                self.log(f"开启{label}失败: {e}", "ERROR")
                 return False
 
-    def stop_virtual_mic_stream(self):
+    def _close_output(self, output, label):
         with self.lock:
-            if self.virtual_mic_stream:
-                try:
-                    self.virtual_mic_stream.stop_stream()
-                    self.virtual_mic_stream.close()
-                except:
-                    pass
-                self.virtual_mic_stream = None
-                self.log("虚拟麦克风流已关闭", "INFO")
+            if output.is_open:
+                output.close()
+                self.log(f"{label}已关闭", "INFO")
+
+    def set_target_latency(self, latency_ms):
+        """设置输出抖动缓冲的目标延迟（毫秒），None 表示按网络抖动自适应"""
+        self.monitor_output.set_target_latency(latency_ms)
+        self.virtual_mic_output.set_target_latency(latency_ms)
+        if latency_ms is None:
+            self.log("输出缓冲切换为自适应模式", "INFO")
+        else:
+            self.log(f"输出缓冲目标延迟调整为: {latency_ms} ms", "INFO")
+
+    def get_output_stats(self):
+        """返回各输出的缓冲时长、设备延迟与欠载/溢出计数"""
+        return {
+            name: {
+                'buffered_ms': output.buffered_ms,
+                'target_ms': output.target_latency_ms,
+                'device_ms': output.device_latency_ms,
+                'underruns': output.underruns,
+                'overruns': output.overruns,
+            }
+            for name, output in (('monitor', self.monitor_output), ('virtual_mic', self.virtual_mic_output))
+            if output.is_open
+        }
+
+    def get_latency_stats(self):
+        """估算端到端延迟：手机采集缓冲（一个包时长）+ 抖动缓冲 + 声卡缓冲，取各输出中最大者"""
+        outputs = [o for o in (self.monitor_output, self.virtual_mic_output) if o.is_open]
+        if not outputs:
+            return None
+        packet_ms = max(o.jitter.packet_ms for o in outputs)
+        buffer_ms = max(o.buffered_ms for o in outputs)
+        device_ms = max(o.device_latency_ms for o in outputs)
+        return {
+            'packet_ms': round(packet_ms, 1),
+            'jitter_ms': round(max(o.jitter.jitter_ms for o in outputs), 1),
+            'buffer_ms': round(buffer_ms, 1),
+            'device_ms': round(device_ms, 1),
+            'total_ms': round(packet_ms + buffer_ms + device_ms, 1),
+            'underruns': sum(o.underruns for o in outputs),
+            'overruns': sum(o.overruns for o in outputs),
+            'packets_lost': sum(s.lost for s in list(self._packet_streams.values())),
+        }
 
     def stop_all_streams(self):
         self.stop_monitor_stream()
         self.stop_virtual_mic_stream()
 
-    def write_audio(self, data):
-        """写入音频数据 - 录制/监听/虚拟麦克风/波形 四条链路并行"""
-        if not isinstance(data, (bytes, bytearray)):
-            try:
-                data = bytes(data)
-            except Exception:
-                return
-        if len(data) == 0:
+    def write_audio(self, data, sid=None):
+        """写入音频数据 - 多台手机同时发送时先进混音器，否则直接分发。
+
+        新版客户端的包带二进制包头，格式以包头为准，包头采样率与引擎不同时按客户端各自重采样；
+        旧版客户端发送裸 PCM，按当前全局模式解释。
+        全程以 memoryview/np.frombuffer 视图处理网络包，不复制原始数据。
+        网络线程直接调用：单个异常包只丢弃并记录，不向上抛出，避免结束该连接的接收循环。
+        """
+        try:
+            view = memoryview(data).cast('B')
+        except (TypeError, ValueError):
+            return
+        if len(view) == 0:
+            return
+        try:
+            self._write_packet(view, sid)
+        except Exception as e:
+            if sid not in self._bad_packet_sids:
+                self._bad_packet_sids.add(sid)
+                self.log(f"丢弃异常音频包 ({sid}): {e}", "WARNING")
+
+    def _write_packet(self, view, sid):
+        # 整包只读一次模式标志，同一包的转换、录制与播放按同一格式处理
+        float_mode = self.is_float32_mode
+        packet = parse_packet(view)
+        if packet is None:
+            dtype = np.float32 if float_mode else np.int16
+            itemsize = np.dtype(dtype).itemsize
+            self._route(np.frombuffer(view, dtype=dtype, count=len(view) // itemsize), sid, float_mode)
+            return
+
+        if packet.is_opus and not self._decode_opus(packet, sid, float_mode):
             return
 
+        stream = self._packet_streams.get(sid)
+        if stream is None:
+            stream = self._packet_streams[sid] = PacketStream()
+        # 包头采样率只决定本客户端的重采样，不改变引擎采样率（否则多台不同采样率的手机会让
+        # 混音器与输出链路反复重建，录音文件头的采样率也会与数据不符）
+        rate = self.input_sample_rate
+        for samples, timestamp in stream.accept(packet):
+            if packet.sample_rate != rate:
+                samples = self._resample_client(stream, samples, packet.sample_rate, rate)
+            self._route(self._to_transport(samples, float_mode), sid, float_mode, timestamp / 1000.0)
+
+    @staticmethod
+    def _resample_client(stream, samples, in_rate, out_rate):
+        """按客户端各自的重采样器把包内样本转换到引擎采样率（滤波历史跨包保留）"""
+        resampler = stream.resampler
+        if (resampler is None or resampler.in_rate != in_rate or resampler.out_rate != out_rate
+                or resampler.dtype != samples.dtype):
+            resampler = stream.resampler = PolyphaseResampler(in_rate, out_rate, dtype=samples.dtype)
+        # 重采样结果是内部缓冲视图，录音队列与混音器会继续持有，这里复制一份
+        return resampler.process(samples).copy()
+
+    def _decode_opus(self, packet, sid, float_mode):
+        """就地把 Opus 包解码为 PCM 包；解码失败的包丢弃，由丢包补偿填补"""
+        if not OPUS_AVAILABLE:
+            return False
+        decoder = self._opus_decoders.get(sid)
+        if decoder is None:
+            decoder = self._opus_decoders[sid] = OpusStreamDecoder()
+        try:
+            packet.samples, packet.sample_rate = decoder.decode(packet.samples, float_mode, self.input_sample_rate)
+        except Exception as e:
+            self.log(f"Opus 解码失败 ({sid}): {e}", "DEBUG")
+            return False
+        packet.format = PACKET_FORMAT_FLOAT32 if packet.samples.dtype == np.float32 else PACKET_FORMAT_INT16
+        return True
+
+    def set_client_codec(self, sid, codec, bitrate=None):
+        """记录客户端请求的编码方式，返回实际采用的编码（服务端不支持 Opus 时为 'pcm'）"""
+        if codec == 'opus' and not OPUS_AVAILABLE:
+            self.log("客户端请求 Opus 编码，但未安装 opuslib/libopus，继续使用 PCM", "WARNING")
+            codec = 'pcm'
+        previous = self._client_codecs.get(sid)
+        self._client_codecs[sid] = codec
+        if codec != previous:
+            if codec == 'opus':
+                self.log(f"客户端 {sid} 使用 Opus 编码 ({(bitrate or 0) // 1000} kbps)", "INFO")
+            elif previous is not None:
+                self.log(f"客户端 {sid} 使用 PCM 传输", "INFO")
+        return codec
+
+    def _to_transport(self, samples, float_mode):
+        """把包内样本转成当前录制/播放链路的格式（切换模式期间的在途包也能正确解释）。
+
+        格式一致时原样返回视图；需要转换时新建数组，因为录音队列会持有它。
+        """
+        if float_mode:
+            if samples.dtype == np.float32:
+                return samples
+            return np.multiply(samples, 1.0 / 32768, dtype=np.float32)
+        if samples.dtype == np.int16:
+            return samples
+        return _float_to_int16(samples, np.empty(len(samples), dtype=np.int16))
+
+    def _route(self, samples, sid, float_mode, timestamp=None):
+        if len(samples) == 0:
+            return
+        tracks = self.track_recorder
+        if tracks is not None and sid is not None and self.is_recording:
+            tracks.write(sid, _byte_view(samples))
+
+        if sid is not None and self.mixer.accepts(sid):
+            # Int16 在写入混音队列时顺带缩放，不生成中间数组
+            self.mixer.push(sid, samples, timestamp, scale=None if float_mode else 1.0 / 32768)
+            return
+
+        with self._dispatch_lock:
+            self._dispatch(samples, float_mode)
+
+    def _on_mixed_block(self, mixed):
+        """混音器输出回调：转回当前传输格式后走与单路相同的分发流程"""
+        float_mode = self.is_float32_mode
+        # mixed 是混音线程复用的缓冲，录音队列会持有结果，这里必须新建一份
+        with self._dispatch_lock:
+            if float_mode:
+                samples = mixed.copy()
+            else:
+                samples = _float_to_int16(mixed, np.empty(len(mixed), dtype=np.int16), self._scratch(len(mixed))[1])
+            self._dispatch(samples, float_mode)
+
+    def set_client_gain(self, sid, gain):
+        """设置客户端在混音中的增益，截断到 [0, MIX_GAIN_MAX]；非有限数值忽略并返回 None，否则返回实际增益"""
+        if isinstance(gain, bool) or not isinstance(gain, (int, float)) or not math.isfinite(gain):
+            return None
+        gain = min(max(float(gain), 0.0), MIX_GAIN_MAX)
+        self.mixer.set_gain(sid, gain)
+        return gain
+
+    def remove_source(self, sid):
+        self.mixer.remove(sid)
+        self._opus_decoders.pop(sid, None)
+        self._client_codecs.pop(sid, None)
+        self._bad_packet_sids.discard(sid)
+        stream = self._packet_streams.pop(sid, None)
+        if stream is not None and stream.lost:
+            self.log(f"客户端 {sid} 共收到 {stream.received} 包，丢包 {stream.lost}，迟到 {stream.late}", "INFO")
+
+    def get_packet_stats(self):
+        """各客户端的收包/丢包/迟到计数"""
+        return {
+            sid: {'received': s.received, 'lost': s.lost, 'late': s.late}
+            for sid, s in list(self._packet_streams.items())
+        }
+
+    def _dispatch(self, samples, float_mode):
+        """录制/监听/虚拟麦克风/波形 四条链路并行。
+
+        samples 为当前传输格式的数组；播放用的 Int16 只转换一次、写入复用的
+        暂存缓冲，两路输出与可视化抽头共用这一份（各自只拷贝/读取，不持有）。
+        调用方持有 _dispatch_lock。
+        """
         # 链路1: 录制（保存原始数据）
         if self.is_recording:
-            self.record_frames.append(data)
+            data = _byte_view(samples)
+            writer = self.record_writer
+            if writer is not None:
+                writer.write(data)
+            else:
+                self.record_frames.append(data)
 
         # 链路2 & 3: 播放（始终转为 Int16）
-        playback_data = None
-
-        if self.is_float32_mode:
-            if len(data) % 4 == 0 and len(data) >= 4:
-                try:
-                    float_array = np.frombuffer(data, dtype=np.float32)
-                    int16_array = (np.clip(float_array, -1.0, 1.0) * 32767).astype(np.int16)
-                    playback_data = int16_array.tobytes()
-                except Exception as e:
-                    sample_count = len(data) // 4
-                    playback_data = np.zeros(sample_count, dtype=np.int16).tobytes()
-                    self.log(f"Float32→Int16 转换失败，输出静音: {e}", "WARNING")
-            else:
-                sample_count = max(1, len(data) // 4)
-                playback_data = np.zeros(sample_count, dtype=np.int16).tobytes()
+        if float_mode:
+            playback = _float_to_int16(samples, *self._scratch(len(samples)))
         else:
-            playback_data = data
+            playback = samples
             if self.input_sample_rate != self.target_sample_rate:
                 try:
-                    int16_array = np.frombuffer(data, dtype=np.int16)
-                    num_samples = len(int16_array)
-                    if num_samples > 0:
-                        new_num_samples = int(num_samples * self.target_sample_rate / self.input_sample_rate)
-                        x_old = np.linspace(0, 1, num_samples)
-                        x_new = np.linspace(0, 1, new_num_samples)
-                        resampled = np.interp(x_new, x_old, int16_array)
-                        playback_data = np.clip(resampled, -32768, 32767).astype(np.int16).tobytes()
+                    resampler = self.resampler
+                    if resampler is None or resampler.in_rate != self.input_sample_rate:
+                        resampler = PolyphaseResampler(self.input_sample_rate, self.target_sample_rate)
+                        self.resampler = resampler
+                    playback = resampler.process(samples)
                 except Exception:
                     pass
 
-        if playback_data is None or len(playback_data) == 0:
+        if len(playback) == 0:
             return
 
-        # 写入监听流
+        # 写入监听/虚拟麦克风缓冲（由各自输出线程送往声卡）
         if self.enable_monitor_playback:
-            with self.lock:
-                if self.monitor_stream:
-                    try:
-                        self.monitor_stream.write(playback_data)
-                    except Exception:
-                        pass
-
-        # 写入虚拟麦克风流
+            self.monitor_output.push(playback)
         if self.enable_virtual_mic_output:
-            with self.lock:
-                if self.virtual_mic_stream:
-                    try:
-                        self.virtual_mic_stream.write(playback_data)
-                    except Exception:
-                        pass
-
-        # 更新实时波形
-        if self.waveform_callback and playback_data:
-            try:
-                self.waveform_callback(playback_data)
-            except Exception:
-                pass
+            self.virtual_mic_output.push(playback)
+
+        # 可视化抽头：只发布抽取后的包络与电平
+        self.visual_tap.feed(playback)
 
-    def start_recording(self):
+    def _scratch(self, n):
+        """返回长度为 n 的 (Int16, Float32) 暂存视图，只在包变长时重新分配"""
+        if len(self._scratch_i16) < n:
+            self._scratch_i16 = np.empty(n, dtype=np.int16)
+            self._scratch_f32 = np.empty(n, dtype=np.float32)
+        return self._scratch_i16[:n], self._scratch_f32[:n]
+
+    def start_recording(self, filepath=None):
+        """开始录制；传入 filepath 且开启流式录音时直接边收边写盘"""
         self.record_frames = []
-        self.is_recording = True
+        self.last_saved_path = None
+        self.last_track_paths = []
         self.recording_sample_rate = self.input_sample_rate
+        if filepath and self.record_multitrack:
+            self.track_recorder = MultitrackRecorder(filepath, self.recording_sample_rate, self.recording_format, self.log)
+        if filepath and self.record_to_disk:
+            writer = StreamingWavWriter(filepath, self.recording_sample_rate, self.recording_format, self.log)
+            try:
+                writer.start()
+                self.record_writer = writer
+            except Exception as e:
+                self.log(f"创建录音文件失败，改为内存录制: {e}", "WARNING")
+        self.is_recording = True
         self.log(f"开始录制音频 (采样率: {self.recording_sample_rate} Hz)...", "INFO")
 
     def stop_recording(self):
-        self.is_recording = False
-        format_name = "Float32 (32-bit)" if self.recording_format == FORMAT_FLOAT32 else "Int16 (16-bit)"
-        self.log(f"停止录制，捕获到 {len(self.record_frames)} 个数据块 (格式: {format_name}, 采样率: {self.recording_sample_rate} Hz)", "INFO")
-        return self.record_frames, self.recording_format, self.recording_sample_rate
+        """停止录制，返回 (内存帧, 格式, 采样率)；流式录音时内存帧为空，文件见 last_saved_path"""
+        # 分发线程持锁读取 record_writer 并写入，持锁换下后不会再有包排在结束标记之后
+        with self._dispatch_lock:
+            self.is_recording = False
+            writer, self.record_writer = self.record_writer, None
+        self._close_tracks()
+        if writer is None:
+            format_name = "Float32 (32-bit)" if self.recording_format == FORMAT_FLOAT32 else "Int16 (16-bit)"
+            self.log(f"停止录制，捕获到 {len(self.record_frames)} 个数据块 (格式: {format_name}, 采样率: {self.recording_sample_rate} Hz)", "INFO")
+            return self.record_frames, self.recording_format, self.recording_sample_rate
+
+        format_name = "Float32 (32-bit)" if writer.data_format == FORMAT_FLOAT32 else "Int16 (16-bit)"
+        self.log(f"停止录制，写入 {writer.chunks_written} 个数据块 (格式: {format_name}, 采样率: {writer.sample_rate} Hz)", "INFO")
+        if writer.close() and writer.bytes_written > 0:
+            self.last_saved_path = writer.filepath
+            self.log(f"音频已保存至: {writer.filepath} ({format_name}, {writer.duration:.1f}秒)", "SUCCESS")
+        elif writer.bytes_written == 0:
+            try:
+                os.remove(writer.filepath)
+            except OSError:
+                pass
+        return [], writer.data_format, writer.sample_rate
+
+    def _close_tracks(self):
+        tracks, self.track_recorder = self.track_recorder, None
+        if tracks is None:
+            return
+        self.last_track_paths = tracks.close()
+        # 只有一台手机时分轨与混音文件内容相同，不重复保留
+        if len(self.last_track_paths) == 1:
+            try:
+                os.remove(self.last_track_paths[0])
+            except OSError:
+                pass
+            remove_peaks(self.last_track_paths[0])
+            self.last_track_paths = []
+        elif self.last_track_paths:
+            self.log(f"已保存 {len(self.last_track_paths)} 个分轨文件", "SUCCESS")
 
     def save_wav(self, frames, filepath, data_format=None, sample_rate=None):
         try:
@@ -230,7 +467,7 @@ class AudioEngine:
             audio_data = b''.join(frames)
 
             if data_format == FORMAT_FLOAT32:
-                return self._save_float32_wav(audio_data, filepath, sample_rate)
+                saved = self._save_float32_wav(audio_data, filepath, sample_rate)
             else:
                 wf = wave.open(filepath, 'wb')
                 wf.setnchannels(CHANNELS)
@@ -239,11 +476,21 @@ class AudioEngine:
                 wf.writeframes(audio_data)
                 wf.close()
                 self.log(f"音频已保存至: {filepath} (16-bit, {sample_rate}Hz)", "SUCCESS")
-                return True
+                saved = True
+            if saved and RECORD_PEAKS:
+                self._save_peaks(filepath, audio_data, data_format, sample_rate)
+            return saved
         except Exception as e:
             self.log(f"保存WAV失败: {e}", "ERROR")
             return False
 
+    def _save_peaks(self, filepath, audio_data, data_format, sample_rate):
+        dtype = np.float32 if data_format == FORMAT_FLOAT32 else np.int16
+        try:
+            save_peaks(filepath, build_peaks(np.frombuffer(audio_data, dtype=dtype), sample_rate))
+        except Exception as e:
+            self.log(f"写入波形峰值文件失败: {e}", "WARNING")
+
     def _save_float32_wav(self, audio_data, filepath, sample_rate=None):
         import struct
         try:
@@ -294,5 +541,8 @@ class AudioEngine:
                 return False
 
     def close(self):
+        if self.record_writer is not None or self.track_recorder is not None:
+            self.stop_recording()
+        self.mixer.stop()
         self.stop_all_streams()
         self.pa.terminate()
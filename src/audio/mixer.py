@@ -0,0 +1,182 @@
+"""多客户端混音器 - 每个 sid 独立输入队列，对齐后按增益求和，输出单路音频"""
+
+import time
+import threading
+import numpy as np
+
+from config import (
+    RATE, MIXER_BLOCK_SIZE, MIXER_PRIME_BLOCKS, MIXER_MAX_BACKLOG_BLOCKS, MIXER_ACTIVE_WINDOW
+)
+from .output import RingBuffer
+
+
+class MixerSource:
+    """单个客户端的输入队列（Float32），记录按时间戳推算的写入位置。
+
+    时间戳只在本客户端内部对齐（以首包为基准补齐空洞、丢弃重叠）；各手机的采集时钟互不相关，
+    不同客户端之间按到达先后混合，不做时钟对齐。
+    """
+
+    def __init__(self, sid, rate, gain=1.0):
+        self.sid = sid
+        self.rate = rate
+        self.gain = gain
+        self.ring = RingBuffer(rate * 2, dtype=np.float32)
+        self.primed = False
+        self.base_ts = None
+        self.samples_written = 0
+
+    def push(self, samples, timestamp=None, scale=None):
+        """写入一包；带采集时间戳时按时间戳补齐丢包造成的空洞、丢弃重叠部分"""
+        if timestamp is not None:
+            if self.base_ts is None:
+                self.base_ts = timestamp
+            expected = int(round((timestamp - self.base_ts) * self.rate))
+            gap = expected - self.samples_written
+            tolerance = len(samples) // 2
+            if gap > tolerance:
+                silence = np.zeros(min(gap, self.rate), dtype=np.float32)
+                self.ring.write(silence)
+                self.samples_written += gap
+            elif gap < -tolerance:
+                overlap = min(-gap, len(samples))
+                samples = samples[overlap:]
+                self.samples_written += overlap
+        self.ring.write(samples, scale)
+        self.samples_written += len(samples)
+
+
+class AudioMixer:
+    """按固定块长节拍混音：每块从各客户端取等长数据，乘增益后原地累加。
+
+    每个客户端每块只做一次块长拷贝和一次乘加，没有整段缓冲复制，
+    8 台以上手机同时接入时开销仍随客户端数线性增长。
+    只有一台手机在发送时由 AudioEngine 直通，不经过混音器。
+    """
+
+    def __init__(self, on_block, log_callback, rate=RATE, block_size=MIXER_BLOCK_SIZE):
+        self.on_block = on_block
+        self.log = log_callback
+        self.rate = rate
+        self.block_size = block_size
+        self._sources = {}
+        self._activity = {}
+        self._gains = {}
+        self._lock = threading.Lock()
+        self._thread = None
+        self._running = False
+
+    @property
+    def source_count(self):
+        return len(self._sources)
+
+    def set_rate(self, rate):
+        """采样率变化时清空所有队列"""
+        with self._lock:
+            self.rate = rate
+            self._sources = {}
+
+    def accepts(self, sid):
+        """记录 sid 的活动；多于一个客户端同时发送（或该客户端仍有待混数据）时返回 True"""
+        now = time.monotonic()
+        self._activity[sid] = now
+        active = 0
+        for other, last_seen in list(self._activity.items()):
+            if now - last_seen < MIXER_ACTIVE_WINDOW:
+                active += 1
+            elif other not in self._sources:
+                self._activity.pop(other, None)
+        if active > 1:
+            return True
+        source = self._sources.get(sid)
+        return source is not None and source.ring.available > 0
+
+    def push(self, sid, samples, timestamp=None, scale=None):
+        """samples 为 Float32，或配合 scale（如 1/32768）直接传入 Int16"""
+        source = self._sources.get(sid)
+        if source is None:
+            with self._lock:
+                source = MixerSource(sid, self.rate, self._gains.get(sid, 1.0))
+                self._sources[sid] = source
+            self.log(f"客户端 {sid} 加入混音 (当前 {len(self._sources)} 路)", "INFO")
+        source.push(samples, timestamp, scale)
+        if not self._running:
+            self._start()
+
+    def set_gain(self, sid, gain):
+        self._gains[sid] = gain
+        source = self._sources.get(sid)
+        if source is not None:
+            source.gain = gain
+
+    def remove(self, sid):
+        with self._lock:
+            removed = self._sources.pop(sid, None)
+        self._activity.pop(sid, None)
+        self._gains.pop(sid, None)
+        if removed is not None:
+            self.log(f"客户端 {sid} 退出混音 (剩余 {len(self._sources)} 路)", "INFO")
+
+    def stop(self):
+        self._running = False
+        if self._thread:
+            self._thread.join(timeout=1.0)
+            self._thread = None
+
+    def _start(self):
+        self._running = True
+        self._thread = threading.Thread(target=self._mix_loop, name="mixer", daemon=True)
+        self._thread.start()
+
+    def _mix_loop(self):
+        block = self.block_size
+        acc = np.zeros(block, dtype=np.float32)
+        scratch = np.zeros(block, dtype=np.float32)
+        next_tick = time.monotonic()
+        idle_since = None
+        while self._running:
+            period = block / self.rate
+            now = time.monotonic()
+            if next_tick > now:
+                time.sleep(next_tick - now)
+            next_tick += period
+            # 线程被长时间挂起后不追赶，直接以当前时间重新对齐节拍
+            if time.monotonic() - next_tick > 0.5:
+                next_tick = time.monotonic()
+
+            acc[:] = 0
+            contributing = 0
+            for source in list(self._sources.values()):
+                ring = source.ring
+                if not source.primed:
+                    if ring.available < block * MIXER_PRIME_BLOCKS:
+                        continue
+                    source.primed = True
+                # 积压过多（客户端时钟偏快或突发到达）时丢弃最旧数据
+                backlog = ring.available - block * MIXER_MAX_BACKLOG_BLOCKS
+                if backlog > 0:
+                    ring.skip(backlog)
+                n = ring.read_into(scratch)
+                if n == 0:
+                    source.primed = False
+                    continue
+                if n < block:
+                    scratch[n:] = 0
+                    source.primed = False
+                if source.gain != 1.0:
+                    np.multiply(scratch, source.gain, out=scratch)
+                np.add(acc, scratch, out=acc)
+                contributing += 1
+
+            if contributing:
+                idle_since = None
+                np.clip(acc, -1.0, 1.0, out=acc)
+                try:
+                    self.on_block(acc)
+                except Exception as e:
+                    self.log(f"混音输出失败: {e}", "ERROR")
+            elif not self._sources:
+                idle_since = idle_since or time.monotonic()
+                if time.monotonic() - idle_since > 2.0:
+                    break
+        self._running = False
@@ -0,0 +1,244 @@
+"""音频输出通道 - 环形缓冲 + 回调/独立输出线程，网络接收线程只写缓冲、从不阻塞在声卡上"""
+
+import time
+import threading
+import numpy as np
+import pyaudio
+
+from config import (
+    CHUNK, FORMAT, CHANNELS, RATE, OUTPUT_TARGET_LATENCY_MS, OUTPUT_LOW_LATENCY, LOW_LATENCY_CHUNK,
+    ADAPTIVE_LATENCY_MIN_MS, ADAPTIVE_LATENCY_MAX_MS
+)
+
+
+class RingBuffer:
+    """单生产者/单消费者环形缓冲（默认 Int16）。
+
+    写指针只由生产者推进、读指针只由消费者推进（均为单调递增整数），
+    两端各自只改自己的指针，因此无需加锁。
+    """
+
+    def __init__(self, capacity, dtype=np.int16):
+        self.capacity = capacity
+        self._buf = np.zeros(capacity, dtype=dtype)
+        self._write_pos = 0
+        self._read_pos = 0
+
+    @property
+    def available(self):
+        return self._write_pos - self._read_pos
+
+    def write(self, samples, scale=None):
+        """写入样本，返回因缓冲已满而丢弃的样本数；scale 不为空时写入的同时乘以该系数"""
+        n = len(samples)
+        free = self.capacity - self.available
+        dropped = max(0, n - free)
+        if dropped:
+            samples = samples[:free]
+            n = free
+        start = self._write_pos % self.capacity
+        first = min(n, self.capacity - start)
+        if scale is None:
+            self._buf[start:start + first] = samples[:first]
+            if first < n:
+                self._buf[:n - first] = samples[first:]
+        else:
+            np.multiply(samples[:first], scale, out=self._buf[start:start + first])
+            if first < n:
+                np.multiply(samples[first:], scale, out=self._buf[:n - first])
+        self._write_pos += n
+        return dropped
+
+    def read_into(self, out):
+        """读满 out，返回实际读取的样本数（不足时只读可用部分）"""
+        n = min(len(out), self.available)
+        start = self._read_pos % self.capacity
+        first = min(n, self.capacity - start)
+        out[:first] = self._buf[start:start + first]
+        if first < n:
+            out[first:n] = self._buf[:n - first]
+        self._read_pos += n
+        return n
+
+    def skip(self, n):
+        """消费者丢弃最旧的 n 个样本（用于追赶延迟）"""
+        n = min(n, self.available)
+        self._read_pos += n
+        return n
+
+    def clear(self):
+        self._read_pos = self._write_pos
+
+
+class JitterEstimator:
+    """按 RFC 3550 的方式估计包到达抖动：实际到达间隔与包内音频时长之差的平滑均值"""
+
+    def __init__(self, rate):
+        self.rate = rate
+        self.jitter_ms = 0.0
+        self.packet_ms = 0.0
+        self._last_arrival = None
+        self._last_duration = 0.0
+
+    def on_packet(self, sample_count, now=None):
+        now = time.monotonic() if now is None else now
+        duration = sample_count * 1000.0 / self.rate
+        if self._last_arrival is not None:
+            deviation = abs((now - self._last_arrival) * 1000.0 - self._last_duration)
+            # 长时间无数据（麦克风关闭后重开）不计入抖动
+            if deviation < 1000:
+                self.jitter_ms += (deviation - self.jitter_ms) / 16
+        self._last_arrival = now
+        self._last_duration = duration
+        self.packet_ms = duration
+
+    def recommended_ms(self):
+        """建议缓冲深度：一个包时长 + 3 倍抖动"""
+        return self.packet_ms + 3 * self.jitter_ms
+
+
+class OutputChannel:
+    """单个输出设备：PyAudio 流 + 抖动缓冲。
+
+    低延迟模式使用 PyAudio 回调 API 和更小的设备缓冲，由声卡线程直接取数；
+    否则由独立线程阻塞写入。缓冲先攒到目标深度再出声，读空记一次欠载并
+    重新预缓冲，积压超过目标两倍时丢弃最旧数据并记一次溢出。自适应模式下
+    目标深度随测得的到达抖动伸缩：抖动变大立即加深，变小时缓慢回落。
+    """
+
+    def __init__(self, pa, name, log_callback, target_latency_ms=OUTPUT_TARGET_LATENCY_MS,
+                 low_latency=OUTPUT_LOW_LATENCY):
+        self.pa = pa
+        self.name = name
+        self.log = log_callback
+        self.rate = RATE
+        self.low_latency = low_latency
+        self.frames_per_buffer = LOW_LATENCY_CHUNK if low_latency else CHUNK
+        self.stream = None
+        self.device_index = None
+        self.underruns = 0
+        self.overruns = 0
+        self.ring = RingBuffer(self.rate * 2)
+        self.jitter = JitterEstimator(self.rate)
+        self.adaptive = False
+        self.target_latency_ms = target_latency_ms
+        self._target_samples = 0
+        self.set_target_latency(target_latency_ms)
+        self._block = np.zeros(self.frames_per_buffer, dtype=np.int16)
+        self._thread = None
+        self._running = False
+        self._primed = False
+
+    @property
+    def is_open(self):
+        return self.stream is not None
+
+    @property
+    def buffered_ms(self):
+        return self.ring.available * 1000.0 / self.rate
+
+    @property
+    def device_latency_ms(self):
+        try:
+            return self.stream.get_output_latency() * 1000.0
+        except Exception:
+            return self.frames_per_buffer * 1000.0 / self.rate
+
+    def set_target_latency(self, latency_ms):
+        """latency_ms 为 None 时启用自适应抖动缓冲"""
+        self.adaptive = latency_ms is None
+        if not self.adaptive:
+            self._apply_target(latency_ms)
+
+    def _apply_target(self, latency_ms):
+        self.target_latency_ms = latency_ms
+        self._target_samples = max(self.frames_per_buffer, int(self.rate * latency_ms / 1000))
+
+    def _adapt_target(self):
+        wanted = min(ADAPTIVE_LATENCY_MAX_MS, max(ADAPTIVE_LATENCY_MIN_MS, self.jitter.recommended_ms()))
+        if wanted > self.target_latency_ms:
+            self._apply_target(wanted)
+        else:
+            self._apply_target(self.target_latency_ms + (wanted - self.target_latency_ms) / 64)
+
+    def open(self, device_index):
+        self.close()
+        self.ring.clear()
+        self._primed = False
+        self._running = True
+        kwargs = {}
+        if self.low_latency:
+            kwargs['stream_callback'] = self._stream_callback
+        self.stream = self.pa.open(
+            format=FORMAT, channels=CHANNELS, rate=self.rate,
+            output=True, output_device_index=device_index,
+            frames_per_buffer=self.frames_per_buffer, **kwargs
+        )
+        self.device_index = device_index
+        if not self.low_latency:
+            self._thread = threading.Thread(target=self._drain_loop, name=f"output-{self.name}", daemon=True)
+            self._thread.start()
+
+    def close(self):
+        self._running = False
+        if self._thread:
+            self._thread.join(timeout=1.0)
+            self._thread = None
+        if self.stream:
+            try:
+                self.stream.stop_stream()
+                self.stream.close()
+            except Exception:
+                pass
+            self.stream = None
+
+    def push(self, pcm):
+        """网络线程调用：只做内存拷贝，不触碰声卡"""
+        if not self._running:
+            return
+        samples = np.frombuffer(pcm, dtype=np.int16) if not isinstance(pcm, np.ndarray) else pcm
+        self.jitter.on_packet(len(samples))
+        if self.adaptive:
+            self._adapt_target()
+        if self.ring.write(samples):
+            self.overruns += 1
+
+    def reset_stats(self):
+        self.underruns = 0
+        self.overruns = 0
+
+    def _fill(self, block):
+        """从缓冲取一整块送声卡，预缓冲/欠载时补静音"""
+        available = self.ring.available
+        if not self._primed:
+            if available < self._target_samples:
+                block[:] = 0
+                return
+            self._primed = True
+
+        # 积压过多时丢弃最旧数据，把延迟拉回目标值
+        if available > self._target_samples * 2:
+            self.ring.skip(available - self._target_samples)
+            self.overruns += 1
+
+        n = self.ring.read_into(block)
+        if n < len(block):
+            block[n:] = 0
+            self.underruns += 1
+            self._primed = False
+
+    def _stream_callback(self, in_data, frame_count, time_info, status):
+        if frame_count > len(self._block):
+            self._block = np.zeros(frame_count, dtype=np.int16)
+        block = self._block[:frame_count]
+        self._fill(block)
+        return block.tobytes(), pyaudio.paContinue
+
+    def _drain_loop(self):
+        block = np.zeros(self.frames_per_buffer, dtype=np.int16)
+        while self._running:
+            self._fill(block)
+            try:
+                self.stream.write(block.tobytes())
+            except Exception:
+                time.sleep(self.frames_per_buffer / self.rate)
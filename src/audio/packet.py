@@ -0,0 +1,136 @@
+"""音频包二进制帧 - 包头携带序号/采集时间戳/采样率/格式/声道数，服务端据此做丢包补偿"""
+
+import struct
+
+import numpy as np
+
+from config import PLC_MAX_PACKETS, PLC_FADE, PACKET_MIN_SAMPLE_RATE, PACKET_MAX_SAMPLE_RATE
+
+# 包头布局（小端，24 字节，payload 起点 4 字节对齐，可直接按 Float32 视图读取）:
+#   magic 'AW' | version u8 | format u8 | channels u8 | 保留 3 字节 |
+#   sample_rate u32 | seq u32 | timestamp f64（采集时刻，毫秒）
+PACKET_MAGIC = b'AW'
+PACKET_VERSION = 1
+PACKET_HEADER = struct.Struct('<2sBBB3xIId')
+
+PACKET_FORMAT_INT16 = 0
+PACKET_FORMAT_FLOAT32 = 1
+PACKET_FORMAT_OPUS = 2
+
+_DTYPES = {PACKET_FORMAT_INT16: np.int16, PACKET_FORMAT_FLOAT32: np.float32}
+
+# 序号倒退超过该值视为客户端重新开始计数（重开麦克风），而不是乱序包
+_SEQ_RESTART_THRESHOLD = 64
+
+
+class AudioPacket:
+    __slots__ = ('seq', 'timestamp', 'sample_rate', 'format', 'channels', 'samples')
+
+    def __init__(self, seq, timestamp, sample_rate, data_format, channels, samples):
+        self.seq = seq
+        self.timestamp = timestamp
+        self.sample_rate = sample_rate
+        self.format = data_format
+        self.channels = channels
+        self.samples = samples
+
+    @property
+    def is_float32(self):
+        return self.format == PACKET_FORMAT_FLOAT32
+
+    @property
+    def is_opus(self):
+        return self.format == PACKET_FORMAT_OPUS
+
+
+def parse_packet(data):
+    """解析带包头的音频包；旧版客户端发送的裸 PCM 返回 None。
+
+    Opus 包的 samples 为压缩数据（memoryview），需先经 codec 解码。
+    包头采样率超出 [PACKET_MIN_SAMPLE_RATE, PACKET_MAX_SAMPLE_RATE] 时抛出 ValueError，整包丢弃
+    （不能当裸 PCM 播放，也不能交给重采样器按该采样率建表）。
+    """
+    if len(data) < PACKET_HEADER.size or data[:2] != PACKET_MAGIC:
+        return None
+    magic, version, data_format, channels, sample_rate, seq, timestamp = PACKET_HEADER.unpack_from(data)
+    if not PACKET_MIN_SAMPLE_RATE <= sample_rate <= PACKET_MAX_SAMPLE_RATE:
+        raise ValueError(f"包头采样率超出范围: {sample_rate}")
+    if data_format == PACKET_FORMAT_OPUS and version == PACKET_VERSION:
+        payload = memoryview(data)[PACKET_HEADER.size:]
+        return AudioPacket(seq, timestamp, sample_rate, data_format, channels, payload)
+    dtype = _DTYPES.get(data_format)
+    if version != PACKET_VERSION or dtype is None or channels < 1:
+        return None
+    itemsize = np.dtype(dtype).itemsize
+    count = (len(data) - PACKET_HEADER.size) // itemsize
+    count -= count % channels
+    samples = np.frombuffer(data, dtype=dtype, count=count, offset=PACKET_HEADER.size)
+    if channels > 1:
+        # 引擎按单声道处理，多声道包在此混为单声道
+        samples = samples.reshape(-1, channels).mean(axis=1).astype(dtype)
+    return AudioPacket(seq, timestamp, sample_rate, data_format, channels, samples)
+
+
+def build_packet(seq, timestamp, sample_rate, samples, channels=1):
+    """按同样的布局打包（供测试脚本模拟客户端）"""
+    data_format = PACKET_FORMAT_FLOAT32 if samples.dtype == np.float32 else PACKET_FORMAT_INT16
+    header = PACKET_HEADER.pack(PACKET_MAGIC, PACKET_VERSION, data_format, channels, sample_rate, seq, timestamp)
+    return header + samples.tobytes()
+
+
+class PacketStream:
+    """单个客户端的包序跟踪与丢包补偿。
+
+    序号出现空洞时，用上一包的内容按 PLC_FADE 逐包衰减填补，最多补
+    PLC_MAX_PACKETS 个包，更长的空洞补静音，保证录音与混音的时间轴不缩短。
+    迟到（序号小于期望值）的包已被补偿过，直接丢弃。
+    """
+
+    def __init__(self):
+        self.expected_seq = None
+        self.received = 0
+        self.lost = 0
+        self.late = 0
+        self._last = None
+        # 包头采样率与引擎不同时由引擎创建，该客户端专用
+        self.resampler = None
+
+    def accept(self, packet):
+        """返回 [(samples, timestamp), ...]，依次为补偿包和本包"""
+        out = []
+        seq = packet.seq
+        if self.expected_seq is not None:
+            gap = (seq - self.expected_seq) & 0xFFFFFFFF
+            if gap >= 0x80000000:
+                behind = 0x100000000 - gap
+                if behind < _SEQ_RESTART_THRESHOLD:
+                    self.late += 1
+                    return out
+                gap = 0
+            elif gap > _SEQ_RESTART_THRESHOLD:
+                # 空洞过大（客户端暂停后重开），交给时间戳对齐处理
+                gap = 0
+            if gap and self._last is not None:
+                out.extend(self._conceal(gap, packet))
+        self.expected_seq = (seq + 1) & 0xFFFFFFFF
+        self.received += 1
+        self._last = packet.samples
+        out.append((packet.samples, packet.timestamp))
+        return out
+
+    def _conceal(self, gap, packet):
+        self.lost += gap
+        last = self._last
+        duration_ms = len(last) * 1000.0 / packet.sample_rate if packet.sample_rate else 0.0
+        ramp = np.linspace(1.0, PLC_FADE, len(last), dtype=np.float32)
+        gain = 1.0
+        filled = []
+        for i in range(gap):
+            timestamp = packet.timestamp - (gap - i) * duration_ms
+            if i < PLC_MAX_PACKETS:
+                concealed = last.astype(np.float32) * (ramp * gain)
+                gain *= PLC_FADE
+                filled.append((concealed.astype(last.dtype), timestamp))
+            else:
+                filled.append((np.zeros_like(last), timestamp))
+        return filled
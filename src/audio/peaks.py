@@ -0,0 +1,239 @@
+"""波形峰值金字塔 - 多分辨率 min/max 摘要，与 WAV 同名存为旁路文件，供长录音缩放浏览"""
+
+import math
+import os
+import struct
+from functools import lru_cache
+from pathlib import Path
+
+import numpy as np
+
+from config import PEAK_LEVELS, PEAK_FILE_SUFFIX, PEAK_CACHE_SIZE
+from .wavfile import memmap_mono, to_float
+
+# 文件布局（小端）:
+#   magic 'AWPK' | version u16 | 层数 u16 | sample_rate u32 | 总帧数 u64 |
+#   源文件大小 u64 | 源文件 mtime_ns i64 | 样本平方和 f64（±1.0 刻度）| 各层每组样本数 u32 × 层数 |
+#   各层数据依次排列，每组 (min, max) 两个 Int16（满幅 ±32767）
+PEAK_MAGIC = b'AWPK'
+PEAK_VERSION = 2
+_HEADER = struct.Struct('<4sHHIQQqd')
+
+
+def peaks_path(wav_path):
+    return Path(wav_path).with_suffix(PEAK_FILE_SUFFIX)
+
+
+def _quantize(values):
+    """任意样本类型的 min/max 换算为 Int16 刻度"""
+    dtype = values.dtype
+    if dtype == np.int16:
+        return values
+    if dtype == np.uint8:
+        return ((values.astype(np.int16) - 128) * 256).astype(np.int16)
+    if dtype == np.int32:
+        return (values >> 16).astype(np.int16)
+    return (np.clip(values, -1.0, 1.0) * 32767).astype(np.int16)
+
+
+def _reduce(pairs, factor):
+    """把 (min, max) 序列每 factor 组合并为一组，不足的尾部单独成组"""
+    n = len(pairs)
+    full = n - n % factor
+    out = np.empty((-(-n // factor), 2), dtype=pairs.dtype)
+    if full:
+        grouped = pairs[:full].reshape(-1, factor, 2)
+        out[:full // factor, 0] = grouped[:, :, 0].min(axis=1)
+        out[:full // factor, 1] = grouped[:, :, 1].max(axis=1)
+    if full < n:
+        out[-1, 0] = pairs[full:, 0].min()
+        out[-1, 1] = pairs[full:, 1].max()
+    return out
+
+
+class PeakPyramid:
+    """各层为 (组数, 2) 的 Int16 数组，第 i 组覆盖帧 [i*block, (i+1)*block)"""
+
+    def __init__(self, sample_rate, total_frames, levels, sum_squares=0.0):
+        self.sample_rate = sample_rate
+        self.total_frames = total_frames
+        self.levels = levels  # [(每组样本数, 数组), ...]，由细到粗
+        self.sum_squares = sum_squares
+
+    @property
+    def peak(self):
+        """整段峰值（满幅比例）"""
+        pairs = self.levels[-1][1]
+        if len(pairs) == 0:
+            return 0.0
+        return min(1.0, max(-int(pairs[:, 0].min()), int(pairs[:, 1].max())) / 32767)
+
+    @property
+    def rms(self):
+        """整段均方根电平（满幅比例，未加权）"""
+        return math.sqrt(self.sum_squares / self.total_frames) if self.total_frames else 0.0
+
+    def level_for(self, samples_per_point):
+        """不超过 samples_per_point 的最粗一层；比最细层还细时返回 None（应读原始样本）"""
+        chosen = None
+        for block, pairs in self.levels:
+            if block <= samples_per_point:
+                chosen = (block, pairs)
+        return chosen
+
+    @staticmethod
+    def read(level, start_frame, end_frame):
+        """取覆盖 [start_frame, end_frame) 的组，返回 (mins, maxs, 首组起始帧)，幅度为 ±1.0"""
+        block, pairs = level
+        first = max(0, start_frame // block)
+        last = min(len(pairs), -(-end_frame // block))
+        rows = pairs[first:last].astype(np.float32) * (1.0 / 32767)
+        return rows[:, 0], rows[:, 1], first * block
+
+    def overview(self, points):
+        """整段降到不超过 points 组，返回 (mins, maxs)，幅度为 ±1.0"""
+        block, pairs = self.level_for(self.total_frames / max(1, points)) or self.levels[0]
+        factor = -(-len(pairs) // max(1, points))
+        if factor > 1:
+            pairs = _reduce(pairs, factor)
+        rows = pairs.astype(np.float32) * (1.0 / 32767)
+        return rows[:, 0], rows[:, 1]
+
+    def save(self, path, source_stat):
+        header = _HEADER.pack(PEAK_MAGIC, PEAK_VERSION, len(self.levels), self.sample_rate,
+                              self.total_frames, source_stat.st_size, source_stat.st_mtime_ns, self.sum_squares)
+        blocks = struct.pack(f'<{len(self.levels)}I', *(block for block, _ in self.levels))
+        # 先写临时文件再替换，避免读者看到写了一半的文件
+        tmp = Path(str(path) + '.tmp')
+        with open(tmp, 'wb') as f:
+            f.write(header)
+            f.write(blocks)
+            for _, pairs in self.levels:
+                f.write(np.ascontiguousarray(pairs, dtype='<i2').tobytes())
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path, source_stat=None):
+        """读取旁路文件；给出源文件 stat 时大小或修改时间不一致返回 None"""
+        with open(path, 'rb') as f:
+            raw = f.read()
+        if len(raw) < _HEADER.size:
+            return None
+        magic, version, count, sample_rate, total_frames, size, mtime_ns, sum_squares = _HEADER.unpack_from(raw)
+        if magic != PEAK_MAGIC or version != PEAK_VERSION:
+            return None
+        if source_stat is not None and (size != source_stat.st_size or mtime_ns != source_stat.st_mtime_ns):
+            return None
+        offset = _HEADER.size
+        blocks = struct.unpack_from(f'<{count}I', raw, offset)
+        offset += 4 * count
+        levels = []
+        for block in blocks:
+            rows = -(-total_frames // block)
+            pairs = np.frombuffer(raw, dtype='<i2', count=rows * 2, offset=offset).reshape(rows, 2)
+            levels.append((block, pairs))
+            offset += rows * 4
+        return cls(sample_rate, total_frames, levels, sum_squares)
+
+
+class PeakBuilder:
+    """逐块喂入样本、增量计算最细一层；finish 时由最细层归并出其余各层"""
+
+    def __init__(self, sample_rate, levels=PEAK_LEVELS):
+        self.sample_rate = sample_rate
+        self.blocks = tuple(levels)
+        self.total_frames = 0
+        self.sum_squares = 0.0
+        self._chunks = []
+        self._pending = None
+
+    def feed(self, samples):
+        """samples 为单声道数组（Int16/Int32/UInt8/Float32 均可），只读取不保留"""
+        if len(samples) == 0:
+            return
+        self.total_frames += len(samples)
+        x = to_float(samples)
+        self.sum_squares += float(np.dot(x, x))
+        if self._pending is not None and len(self._pending):
+            samples = np.concatenate((self._pending, samples))
+        block = self.blocks[0]
+        full = len(samples) - len(samples) % block
+        if full:
+            grouped = samples[:full].reshape(-1, block)
+            pairs = np.empty((len(grouped), 2), dtype=np.int16)
+            pairs[:, 0] = _quantize(grouped.min(axis=1))
+            pairs[:, 1] = _quantize(grouped.max(axis=1))
+            self._chunks.append(pairs)
+        self._pending = samples[full:].copy()
+
+    def feed_silence(self, frames, dtype=np.int16):
+        zeros = np.zeros(min(frames, 1 << 16), dtype=dtype)
+        while frames > 0:
+            n = min(frames, len(zeros))
+            self.feed(zeros[:n])
+            frames -= n
+
+    def finish(self):
+        chunks = list(self._chunks)
+        if self._pending is not None and len(self._pending):
+            tail = np.array([self._pending.min(), self._pending.max()], dtype=self._pending.dtype)
+            chunks.append(_quantize(tail).reshape(1, 2))
+        base = np.concatenate(chunks) if chunks else np.zeros((0, 2), dtype=np.int16)
+        levels = [(self.blocks[0], base)]
+        for block in self.blocks[1:]:
+            levels.append((block, _reduce(base, block // self.blocks[0])))
+        return PeakPyramid(self.sample_rate, self.total_frames, levels, self.sum_squares)
+
+
+def build_peaks(samples, sample_rate, levels=PEAK_LEVELS, chunk_frames=1 << 20):
+    builder = PeakBuilder(sample_rate, levels)
+    # 分块喂入：内存映射的数据逐段读盘；块长为首层组长的整数倍，块间不产生拼接拷贝
+    for i in range(0, len(samples), chunk_frames):
+        builder.feed(samples[i:i + chunk_frames])
+    return builder.finish()
+
+
+def save_peaks(wav_path, pyramid):
+    """写出 WAV 的旁路文件（须在 WAV 写完、关闭之后调用，以记录最终的大小与修改时间）"""
+    pyramid.save(peaks_path(wav_path), os.stat(wav_path))
+
+
+def load_peaks(wav_path):
+    """读取有效的旁路文件；不存在、已损坏或与 WAV 不一致时返回 None"""
+    try:
+        return PeakPyramid.load(peaks_path(wav_path), os.stat(wav_path))
+    except (OSError, ValueError, struct.error):
+        return None
+
+
+def load_or_build_peaks(wav_path, read_samples):
+    """旁路文件有效则直接读取，否则调用 read_samples() 取 (样本, 采样率) 生成并尽量写回"""
+    pyramid = load_peaks(wav_path)
+    if pyramid is not None:
+        return pyramid
+    samples, sample_rate = read_samples()
+    pyramid = build_peaks(samples, sample_rate)
+    try:
+        save_peaks(wav_path, pyramid)
+    except OSError:
+        # 目录只读等情况下只在内存中使用
+        pass
+    return pyramid
+
+
+@lru_cache(maxsize=PEAK_CACHE_SIZE)
+def _cached_peaks(path, mtime_ns, size):
+    return load_or_build_peaks(path, lambda: memmap_mono(path))
+
+
+def cached_peaks(wav_path):
+    """带内存缓存的 load_or_build_peaks（按 路径/修改时间/大小），服务端反复请求同一录音时不再读旁路文件"""
+    st = os.stat(wav_path)
+    return _cached_peaks(str(wav_path), st.st_mtime_ns, st.st_size)
+
+
+def remove_peaks(wav_path):
+    try:
+        peaks_path(wav_path).unlink()
+    except OSError:
+        pass
@@ -0,0 +1,316 @@
+"""流式录音写入器 - 后台线程边收边写 WAV，定期回填 RIFF/data 长度并落盘，支持启动时修复残缺录音"""
+
+import os
+import time
+import queue
+import struct
+import threading
+from pathlib import Path
+
+import numpy as np
+
+from config import FORMAT_FLOAT32, CHANNELS, RECORD_FLUSH_INTERVAL, RECORD_MULTITRACK_GAP_TOLERANCE, RECORD_PEAKS
+from .peaks import PeakBuilder, save_peaks
+
+WAV_HEADER_SIZE = 44
+
+
+def build_wav_header(data_size, sample_rate, data_format, channels=CHANNELS):
+    """构建 44 字节标准 WAV 头（Int16 为 PCM，Float32 为 IEEE Float）；超过 4GB 时长度字段封顶"""
+    if data_format == FORMAT_FLOAT32:
+        audio_format, bits_per_sample = 3, 32
+    else:
+        audio_format, bits_per_sample = 1, 16
+    block_align = channels * bits_per_sample // 8
+    byte_rate = sample_rate * block_align
+    return (
+        b'RIFF' + struct.pack('<I', min(36 + data_size, 0xFFFFFFFF)) + b'WAVE'
+        + b'fmt ' + struct.pack('<IHHIIHH', 16, audio_format, channels,
+                                sample_rate, byte_rate, block_align, bits_per_sample)
+        + b'data' + struct.pack('<I', min(data_size, 0xFFFFFFFF))
+    )
+
+
+class StreamingWavWriter:
+    """录音数据入队后由后台线程顺序写盘，内存占用与录制时长无关。
+
+    每隔 flush_interval 秒回填一次文件头并 fsync，进程崩溃或断电时
+    最多丢失最后几秒，文件本身始终是可播放的 WAV。
+    开启 peaks 时写盘线程顺带累积波形峰值，关闭后在 WAV 旁写出 .peaks 旁路文件。
+    """
+
+    def __init__(self, filepath, sample_rate, data_format, log_callback=None, channels=CHANNELS,
+                 flush_interval=RECORD_FLUSH_INTERVAL, peaks=RECORD_PEAKS):
+        self.filepath = str(filepath)
+        self.sample_rate = sample_rate
+        self.data_format = data_format
+        self.channels = channels
+        self.flush_interval = flush_interval
+        self.log = log_callback or (lambda m, l: None)
+        self.bytes_written = 0
+        self.chunks_written = 0
+        self._queue = queue.Queue()
+        self._file = None
+        self._thread = None
+        self._error = None
+        # 峰值只对单声道计算（与引擎链路一致）
+        self._peaks = PeakBuilder(sample_rate) if peaks and channels == 1 else None
+        self._dtype = np.float32 if data_format == FORMAT_FLOAT32 else np.int16
+
+    @property
+    def sample_width(self):
+        return 4 if self.data_format == FORMAT_FLOAT32 else 2
+
+    @property
+    def duration(self):
+        return self.bytes_written / (self.sample_width * self.channels * self.sample_rate)
+
+    def start(self):
+        self._file = open(self.filepath, 'wb')
+        self._file.write(build_wav_header(0, self.sample_rate, self.data_format, self.channels))
+        self._thread = threading.Thread(target=self._writer_loop, daemon=True)
+        self._thread.start()
+
+    def write(self, data):
+        """非阻塞：只做入队，实际写盘在后台线程完成"""
+        self._queue.put(data)
+
+    def write_silence(self, frames):
+        """非阻塞：追加 frames 帧静音，由后台线程分块写出，不在内存中展开"""
+        if frames > 0:
+            self._queue.put(int(frames))
+
+    def _writer_loop(self):
+        last_flush = time.monotonic()
+        while True:
+            try:
+                data = self._queue.get(timeout=self.flush_interval)
+            except queue.Empty:
+                data = b''
+            if data is None:
+                break
+            if self._error is not None:
+                continue
+            try:
+                if isinstance(data, int):
+                    self._write_zeros(data * self.sample_width * self.channels)
+                    if self._peaks is not None:
+                        self._peaks.feed_silence(data, self._dtype)
+                elif data:
+                    self._file.write(data)
+                    self.bytes_written += len(data)
+                    self.chunks_written += 1
+                    if self._peaks is not None:
+                        self._peaks.feed(np.frombuffer(data, dtype=self._dtype))
+                now = time.monotonic()
+                if now - last_flush >= self.flush_interval:
+                    self._flush_to_disk()
+                    last_flush = now
+            except Exception as e:
+                self._error = e
+                self.log(f"录音写盘失败: {e}", "ERROR")
+
+    def _write_zeros(self, size):
+        zeros = bytes(min(size, 1 << 16))
+        while size > 0:
+            n = min(size, len(zeros))
+            self._file.write(zeros[:n])
+            self.bytes_written += n
+            size -= n
+
+    def _flush_to_disk(self):
+        """回填当前长度并强制落盘，保证崩溃后文件头与数据一致"""
+        self._patch_header()
+        self._file.flush()
+        os.fsync(self._file.fileno())
+
+    def _patch_header(self):
+        # data 长度必须是整帧，避免尾部残缺样本
+        frame_size = self.sample_width * self.channels
+        data_size = self.bytes_written - self.bytes_written % frame_size
+        self._file.seek(0)
+        self._file.write(build_wav_header(data_size, self.sample_rate, self.data_format, self.channels))
+        self._file.seek(0, 2)
+
+    def close(self):
+        """等待队列写完，回填文件头并关闭；返回是否成功"""
+        if self._thread is None:
+            return False
+        self._queue.put(None)
+        self._thread.join()
+        self._thread = None
+        try:
+            self._flush_to_disk()
+            self._file.close()
+        except Exception as e:
+            self.log(f"回填 WAV 文件头失败: {e}", "ERROR")
+            return False
+        if self._error is None and self._peaks is not None and self.bytes_written > 0:
+            try:
+                save_peaks(self.filepath, self._peaks.finish())
+            except Exception as e:
+                self.log(f"写入波形峰值文件失败: {e}", "WARNING")
+        return self._error is None
+
+
+class MultitrackRecorder:
+    """分轨录音：每个客户端 (sid) 各写一个 WAV，与混音文件同时录制。
+
+    每轨按录制开始后的墙钟时间对齐：客户端中途加入或暂停后恢复时，
+    落后的部分以静音补齐，导入编辑软件后各轨从同一时间点开始。
+    各轨复用 StreamingWavWriter，内存占用与录制时长无关。
+    """
+
+    def __init__(self, base_path, sample_rate, data_format, log_callback=None,
+                 gap_tolerance=RECORD_MULTITRACK_GAP_TOLERANCE):
+        path = Path(base_path)
+        self._dir = path.parent
+        self._stem = path.stem
+        self._suffix = ""
+        if self._stem.endswith("_32bit"):
+            self._stem, self._suffix = self._stem[:-len("_32bit")], "_32bit"
+        self.sample_rate = sample_rate
+        self.data_format = data_format
+        self.gap_tolerance = gap_tolerance
+        self.log = log_callback or (lambda m, l: None)
+        self._tracks = {}
+        self._frames = {}
+        self._start_time = time.monotonic()
+        self._frame_size = 4 if data_format == FORMAT_FLOAT32 else 2
+
+    @property
+    def track_count(self):
+        return len(self._tracks)
+
+    def write(self, sid, data):
+        writer = self._tracks.get(sid)
+        if writer is None:
+            writer = self._open_track(sid)
+            if writer is None:
+                return
+        expected = int((time.monotonic() - self._start_time) * self.sample_rate)
+        frames = len(data) // self._frame_size
+        # 本包结束时的位置落后墙钟超过容差，说明之前有空档，先补静音
+        lag = expected - (self._frames[sid] + frames)
+        if lag > self.gap_tolerance * self.sample_rate:
+            writer.write_silence(lag)
+            self._frames[sid] += lag
+        writer.write(data)
+        self._frames[sid] += frames
+
+    def _open_track(self, sid):
+        index = len(self._tracks) + 1
+        filepath = self._dir / f"{self._stem}_T{index}{self._suffix}.wav"
+        writer = StreamingWavWriter(filepath, self.sample_rate, self.data_format, self.log)
+        try:
+            writer.start()
+        except Exception as e:
+            self.log(f"创建分轨文件失败 {filepath.name}: {e}", "ERROR")
+            self._tracks[sid] = None
+            return None
+        self._tracks[sid] = writer
+        self._frames[sid] = 0
+        self.log(f"客户端 {sid} 分轨录制 → {filepath.name}", "INFO")
+        return writer
+
+    def close(self):
+        """关闭所有分轨，返回成功写入的文件路径列表（空轨文件会被删除）"""
+        saved = []
+        for writer in self._tracks.values():
+            if writer is None:
+                continue
+            if writer.close() and writer.bytes_written > 0:
+                saved.append(writer.filepath)
+            elif writer.bytes_written == 0:
+                try:
+                    os.remove(writer.filepath)
+                except OSError:
+                    pass
+        self._tracks = {}
+        return saved
+
+
+def _is_chunk_id(chunk_id):
+    """RIFF 块 ID 为 4 个可打印 ASCII 字符（可含空格，如 'fmt '、'id3 '、'cue '）"""
+    return len(chunk_id) == 4 and all(0x20 <= c <= 0x7E for c in chunk_id)
+
+
+def repair_wav(filepath):
+    """按实际文件大小修正 RIFF/data 长度，返回是否做了修改。
+
+    本程序录制的文件 data 总是最后一个块，崩溃时文件头记录的长度落后于实际写入量。
+    只在声明的 data 长度小于文件剩余部分、且其后的字节不能解析为合法块时修复；
+    data 之后带有其他块（如编辑软件写入的 LIST、id3 ）的文件视为完整文件不做处理。
+    尾部不足一帧的残缺字节会被截掉。先只读检查，确需修复时才以写方式打开。
+    """
+    with open(filepath, 'rb') as f:
+        header = f.read(12)
+        if len(header) < 12 or header[:4] != b'RIFF' or header[8:12] != b'WAVE':
+            return False
+        file_size = os.fstat(f.fileno()).st_size
+        block_align = 0
+        while True:
+            chunk_header = f.read(8)
+            if len(chunk_header) < 8:
+                return False
+            chunk_id = chunk_header[:4]
+            chunk_size = struct.unpack('<I', chunk_header[4:])[0]
+            if chunk_id == b'fmt ':
+                fmt = f.read(chunk_size)
+                if len(fmt) < 16:
+                    return False
+                block_align = struct.unpack('<H', fmt[12:14])[0]
+                # 奇数长度的块后有一个填充字节
+                f.seek(chunk_size & 1, 1)
+            elif chunk_id == b'data':
+                break
+            else:
+                f.seek(chunk_size + (chunk_size & 1), 1)
+        if block_align <= 0:
+            return False
+
+        data_offset = f.tell()
+        declared_end = data_offset + chunk_size
+        if declared_end >= file_size:
+            return False
+        if chunk_size == 0xFFFFFFFF:
+            # 超过 4GB 的录音长度字段封顶，读取端按文件实际大小计算，无需修复
+            return False
+        next_offset = declared_end + (chunk_size & 1)
+        if next_offset + 8 <= file_size:
+            f.seek(next_offset)
+            next_chunk = f.read(8)
+            if _is_chunk_id(next_chunk[:4]) \
+                    and next_offset + 8 + struct.unpack('<I', next_chunk[4:])[0] <= file_size:
+                return False
+
+    actual_size = file_size - data_offset
+    actual_size -= actual_size % block_align
+    riff_size = data_offset - 8 + actual_size
+    with open(filepath, 'r+b') as f:
+        f.seek(4)
+        f.write(struct.pack('<I', min(riff_size, 0xFFFFFFFF)))
+        f.seek(data_offset - 4)
+        f.write(struct.pack('<I', min(actual_size, 0xFFFFFFFF)))
+        f.truncate(data_offset + actual_size)
+    return True
+
+
+def recover_recordings(record_dir, log_callback=None, files=None):
+    """修复因崩溃/断电而长度不正确的 REC_*.wav，返回修复的文件名列表。
+
+    files 为要检查的文件（默认扫描录制目录）；后台线程调用时应在启动前列出，
+    避免碰到之后开始录制、仍在写入的文件。
+    """
+    log = log_callback or (lambda m, l: None)
+    repaired = []
+    if files is None:
+        files = sorted(Path(record_dir).glob("REC_*.wav"))
+    for wav_file in files:
+        try:
+            if repair_wav(wav_file):
+                repaired.append(wav_file.name)
+                log(f"已修复未正常结束的录音: {wav_file.name}", "WARNING")
+        except Exception as e:
+            log(f"修复录音失败 {wav_file.name}: {e}", "ERROR")
+    return repaired
@@ -0,0 +1,99 @@
+"""有状态多相 FIR 重采样器 - 跨包保留滤波历史，避免块边界不连续"""
+
+from math import gcd
+
+import numpy as np
+
+
+class PolyphaseResampler:
+    """Int16（或 Float32）单声道流式重采样（有理数比 up/down，Kaiser 窗 sinc 原型滤波器）。
+
+    每个采样率对只在构造时计算一次多相系数表；每包所需的输入下标和逐点系数
+    按 (起始相位, 包长) 缓存，包长固定时起始相位只有少数几种取值，
+    稳定后每包只剩一次窗口收集和一次 einsum，全部写入预分配缓冲。
+    返回值是内部输出缓冲的视图，下一次调用前必须用完或复制。
+    """
+
+    def __init__(self, in_rate, out_rate, taps_per_phase=16, kaiser_beta=8.0, dtype=np.int16):
+        g = gcd(int(in_rate), int(out_rate))
+        self.dtype = np.dtype(dtype)
+        self.in_rate = in_rate
+        self.out_rate = out_rate
+        self.up = int(out_rate) // g
+        self.down = int(in_rate) // g
+        self.taps = taps_per_phase
+
+        # 原型低通：截止频率取两侧奈奎斯特频率较小者，留 10% 过渡带
+        n = self.up * self.taps
+        cutoff = 0.9 * 0.5 / max(self.up, self.down)
+        t = np.arange(n) - (n - 1) / 2
+        h = 2 * cutoff * np.sinc(2 * cutoff * t) * np.kaiser(n, kaiser_beta)
+        h *= self.up / h.sum()
+        # phase_table[p, k] 与输入窗口 x[i-taps+1 .. i] 逐项相乘即得输出
+        self.phase_table = h.reshape(self.taps, self.up).T[:, ::-1].astype(np.float32).copy()
+
+        self._history = np.zeros(self.taps - 1, dtype=np.float32)
+        self._t = 0
+        self._plan_cache = {}
+        self._alloc(4096)
+
+    def _alloc(self, max_in):
+        """按最大包长分配工作缓冲，包变长时才重新分配"""
+        self._max_in = max_in
+        max_out = max_in * self.up // self.down + 2
+        self._xx = np.empty(max_in + self.taps - 1, dtype=np.float32)
+        self._windows = np.empty((max_out, self.taps), dtype=np.float32)
+        self._acc = np.empty(max_out, dtype=np.float32)
+        self._out = np.empty(max_out, dtype=self.dtype) if self.dtype != np.float32 else None
+
+    def _plan(self, t0, length):
+        """返回该包每个输出点对应的输入窗口下标及其系数行"""
+        key = (t0, length)
+        cached = self._plan_cache.get(key)
+        if cached is None:
+            n_out = max(0, -(-(length * self.up - t0) // self.down))
+            pos = t0 + np.arange(n_out, dtype=np.int64) * self.down
+            # 每个输出点对应 xx 中一段长 taps 的窗口，直接展开成二维下标
+            window_idx = (pos // self.up)[:, None] + np.arange(self.taps)
+            coefs = self.phase_table[pos % self.up]
+            if len(self._plan_cache) >= 16:
+                self._plan_cache.clear()
+            cached = self._plan_cache[key] = (window_idx.astype(np.intp), coefs)
+        return cached
+
+    def reset(self):
+        self._history[:] = 0
+        self._t = 0
+
+    def process(self, samples):
+        """输入 Int16（或 Float32）数组，返回同类型的重采样结果（内部缓冲视图）"""
+        length = len(samples)
+        if length == 0:
+            return self._acc[:0] if self._out is None else self._out[:0]
+        if length > self._max_in:
+            self._alloc(length)
+
+        h = self.taps - 1
+        xx = self._xx[:length + h]
+        xx[:h] = self._history
+        xx[h:] = samples
+
+        window_idx, coefs = self._plan(self._t, length)
+        n_out = len(window_idx)
+        windows = self._windows[:n_out]
+        acc = self._acc[:n_out]
+
+        np.take(xx, window_idx, out=windows, mode='clip')
+        np.einsum('ij,ij->i', windows, coefs, out=acc)
+        if self._out is None:
+            np.clip(acc, -1.0, 1.0, out=acc)
+            out = acc
+        else:
+            out = self._out[:n_out]
+            np.clip(acc, -32768, 32767, out=acc)
+            np.rint(acc, out=acc)
+            np.copyto(out, acc, casting='unsafe')
+
+        self._history[:] = xx[length:]
+        self._t = self._t + n_out * self.down - length * self.up
+        return out
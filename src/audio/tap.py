@@ -0,0 +1,107 @@
+"""可视化抽头 - 音频线程只发布抽取后的包络与电平，界面按自己的定时器来取"""
+
+import numpy as np
+
+from config import RATE, TAP_DECIMATION, TAP_RING_SECONDS, TAP_LEVEL_SLOTS
+
+
+class VisualTap:
+    """单生产者、多读者的可视化数据环。
+
+    生产者（音频分发线程）每包只做一次向量化的 min/max 抽取和 RMS/峰值计算，
+    结果写入两个小环：包络环按 TAP_DECIMATION 个样本一组存 (min, max)，
+    电平环每包存一组 (rms, peak)。写完数据后才推进位置计数，读者各自记住
+    上次读到的位置，只读不写，因此双方都不需要加锁。读者落后超过一圈时
+    只能拿到最近一圈数据（最旧的条目可能正被覆盖，对显示无影响）。
+    """
+
+    def __init__(self, rate=RATE, decimation=TAP_DECIMATION, ring_seconds=TAP_RING_SECONDS,
+                 level_slots=TAP_LEVEL_SLOTS):
+        self.rate = rate
+        self.decimation = decimation
+        self.bucket_rate = rate / decimation
+        self._env_capacity = max(1, int(ring_seconds * self.bucket_rate))
+        self._env = np.zeros((self._env_capacity, 2), dtype=np.float32)
+        self._env_pos = 0
+        self._levels = np.zeros((level_slots, 2), dtype=np.float32)
+        self._level_pos = 0
+        # 不足一组的尾部样本留到下一包
+        self._pending = np.zeros(decimation, dtype=np.float32)
+        self._pending_len = 0
+        self._scratch = np.zeros(0, dtype=np.float32)
+
+    @property
+    def envelope_position(self):
+        return self._env_pos
+
+    @property
+    def level_position(self):
+        return self._level_pos
+
+    def feed(self, samples):
+        """生产者调用：samples 为 Int16 数组（只读取，不保留）"""
+        n = len(samples)
+        if n == 0:
+            return
+        p = self._pending_len
+        total = p + n
+        if len(self._scratch) < total:
+            self._scratch = np.zeros(total, dtype=np.float32)
+        buf = self._scratch[:total]
+        buf[:p] = self._pending[:p]
+        x = buf[p:]
+        # 先原样拷入 float32 再原地缩放，避免混合类型运算走 float64 中转缓冲
+        np.copyto(x, samples, casting='unsafe')
+        np.multiply(x, np.float32(1.0 / 32768), out=x)
+
+        rms = np.sqrt(np.dot(x, x) / n)
+        peak = max(-float(x.min()), float(x.max()))
+        self._levels[self._level_pos % len(self._levels)] = (rms, peak)
+        self._level_pos += 1
+
+        d = self.decimation
+        full = total - total % d
+        if full:
+            blocks = buf[:full].reshape(-1, d)
+            self._publish(blocks.min(axis=1), blocks.max(axis=1))
+        rest = total - full
+        self._pending[:rest] = buf[full:]
+        self._pending_len = rest
+
+    def _publish(self, mins, maxs):
+        cap = self._env_capacity
+        k = len(mins)
+        if k > cap:
+            mins, maxs = mins[-cap:], maxs[-cap:]
+            skipped, k = k - cap, cap
+        else:
+            skipped = 0
+        start = (self._env_pos + skipped) % cap
+        first = min(k, cap - start)
+        self._env[start:start + first, 0] = mins[:first]
+        self._env[start:start + first, 1] = maxs[:first]
+        if first < k:
+            self._env[:k - first, 0] = mins[first:]
+            self._env[:k - first, 1] = maxs[first:]
+        self._env_pos += skipped + k
+
+    def read_envelope(self, since):
+        """返回 since 之后发布的包络 (mins, maxs, 新位置)"""
+        rows, pos = self._read(self._env, self._env_pos, since)
+        return rows[:, 0], rows[:, 1], pos
+
+    def read_levels(self, since):
+        """返回 since 之后各包的 (rms, peak, 新位置)"""
+        rows, pos = self._read(self._levels, self._level_pos, since)
+        return rows[:, 0], rows[:, 1], pos
+
+    @staticmethod
+    def _read(ring, pos, since):
+        cap = len(ring)
+        count = min(pos - since, cap)
+        if count <= 0:
+            return ring[:0].copy(), pos
+        start = (pos - count) % cap
+        if start + count <= cap:
+            return ring[start:start + count].copy(), pos
+        return np.concatenate((ring[start:], ring[:start + count - cap])), pos
@@ -0,0 +1,254 @@
+"""浏览器兼容转码 - 把 Float32 等浏览器无法播放的 WAV 按需换算为 Int16 WAV，以及下载用的压缩格式。
+
+转码结果是一个"虚拟文件"：总长度由源文件头即可算出，任意字节区间都能只换算覆盖到的
+那段样本，因此可以直接响应 HTTP Range 请求，拖动进度条不必重新转换整个文件。
+完整的转码结果另存入磁盘缓存，之后的播放直接按文件发送。
+FLAC/Opus/MP3 由 ffmpeg（可选依赖，需在 PATH 中）编码，输出经管道边读边发送。
+"""
+
+import os
+import re
+import shutil
+import struct
+import subprocess
+import tempfile
+import threading
+from pathlib import Path
+
+import numpy as np
+
+from config import (TRANSCODE_CHUNK_SAMPLES, TRANSCODE_CACHE_MAX_BYTES, FFMPEG_BINARY,
+                    DOWNLOAD_OPUS_BITRATE, DOWNLOAD_MP3_BITRATE)
+from .wavfile import wav_info, memmap_samples, to_float
+
+try:
+    # 服务端运行在 eventlet 上时，管道的阻塞读放到线程池执行，避免编码期间卡住同一线程上的实时音频连接
+    from eventlet import tpool
+except ImportError:
+    tpool = None
+
+FFMPEG_PATH = shutil.which(FFMPEG_BINARY)
+
+# 下载格式: 名称 -> (扩展名, MIME 类型, ffmpeg 输出参数)
+ENCODED_FORMATS = {
+    'flac': ('.flac', 'audio/flac', ['-c:a', 'flac', '-f', 'flac']),
+    'opus': ('.opus', 'audio/ogg', ['-c:a', 'libopus', '-b:a', DOWNLOAD_OPUS_BITRATE, '-f', 'opus']),
+    'mp3': ('.mp3', 'audio/mpeg', ['-c:a', 'libmp3lame', '-b:a', DOWNLOAD_MP3_BITRATE, '-f', 'mp3']),
+}
+
+_WAV_HEADER = struct.Struct('<4sI4s4sIHHIIHH4sI')
+# 缓存文件名在源文件名之后的部分：.<mtime_ns>-<大小>.<扩展名>（十六进制）
+_CACHE_KEY = re.compile(r'([0-9a-f]+-[0-9a-f]+)\.\w+')
+
+
+def int16_wav_header(channels, sample_rate, frames):
+    """标准 44 字节 PCM 16-bit 文件头；超过 4GB 时长度字段封顶"""
+    data_size = frames * channels * 2
+    return _WAV_HEADER.pack(b'RIFF', min(36 + data_size, 0xFFFFFFFF), b'WAVE', b'fmt ', 16, 1,
+                            channels, sample_rate, sample_rate * channels * 2, channels * 2, 16,
+                            b'data', min(data_size, 0xFFFFFFFF))
+
+
+def to_int16(samples):
+    return (np.clip(to_float(samples), -1.0, 1.0) * 32767).astype('<i2')
+
+
+class Int16Rendition:
+    """源 WAV 对应的 Int16 WAV：size 为转码后的总字节数，iter_range 按字节区间分块生成内容"""
+
+    def __init__(self, path, info=None):
+        self.path = path
+        self.info = info or wav_info(path)
+        self.header = int16_wav_header(self.info.channels, self.info.sample_rate, self.info.frames)
+        self.size = len(self.header) + self.info.frames * self.info.channels * 2
+
+    def iter_range(self, start=0, stop=None, chunk_samples=TRANSCODE_CHUNK_SAMPLES):
+        """生成 [start, stop) 的字节；只读取并换算覆盖到的样本（内存映射按页读盘），内存占用与区间长度无关"""
+        stop = self.size if stop is None else min(stop, self.size)
+        header_len = len(self.header)
+        if start < header_len:
+            yield self.header[start:min(stop, header_len)]
+            start = header_len
+        if start >= stop:
+            return
+        samples = memmap_samples(self.path, self.info).reshape(-1)
+        # 区间可能从半个样本开始或结束，按整样本换算后再裁掉多余的字节
+        first = (start - header_len) // 2
+        end = -(-(stop - header_len) // 2)
+        for i in range(first, end, chunk_samples):
+            data = to_int16(samples[i:min(i + chunk_samples, end)]).tobytes()
+            offset = header_len + 2 * i
+            yield data[max(0, start - offset):stop - offset]
+
+
+class TranscodeCache:
+    """转码结果的磁盘缓存：文件名含源文件的 mtime_ns 与大小，源文件改写后旧结果自然失效；
+    命中时刷新缓存文件的修改时间作为最近访问时间，总大小超过上限时从最久未访问的开始删除。
+    """
+
+    def __init__(self, cache_dir, max_bytes=TRANSCODE_CACHE_MAX_BYTES, log_callback=None):
+        self.cache_dir = Path(cache_dir)
+        self.max_bytes = max_bytes
+        self.log = log_callback or (lambda msg, level="INFO": None)
+        self._lock = threading.Lock()
+        self._pending = set()
+
+    @staticmethod
+    def _version(src):
+        st = os.stat(src)
+        return f"{st.st_mtime_ns:x}-{st.st_size:x}"
+
+    def path_for(self, src, ext='.wav'):
+        return self.cache_dir / f"{Path(src).name}.{self._version(src)}{ext}"
+
+    def get(self, src, ext='.wav'):
+        """返回有效的缓存文件路径并记为最近访问；未命中返回 None"""
+        path = self.path_for(src, ext)
+        try:
+            os.utime(path)
+        except OSError:
+            return None
+        return path
+
+    def _create_tmp(self):
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(suffix='.tmp', dir=self.cache_dir)
+        return os.fdopen(fd, 'wb'), tmp
+
+    def _commit(self, src, ext, path, tmp):
+        """临时文件替换到位；转码期间源文件被改写时结果作废，返回 False"""
+        try:
+            current = self.path_for(src, ext)
+        except OSError:
+            current = None
+        if current != path:
+            self.log(f"转码期间源文件已变化，不写入缓存: {Path(src).name}", "WARNING")
+            return False
+        os.replace(tmp, path)
+        self.remove(Path(src).name, keep_version=self._version(src))
+        self.evict()
+        return True
+
+    def put(self, src, write, ext='.wav'):
+        """write(f) 把转码结果写入已打开的文件；写完替换到位并淘汰超额的旧文件，返回缓存路径（作废时为 None）"""
+        path = self.path_for(src, ext)
+        f, tmp = self._create_tmp()
+        try:
+            with f:
+                write(f)
+            return path if self._commit(src, ext, path, tmp) else None
+        finally:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+
+    def tee(self, src, chunks, ext):
+        """边产出 chunks 边写入缓存：全部产出后才提交，中途断开（生成器被关闭）或出错则丢弃"""
+        path = self.path_for(src, ext)
+        f, tmp = self._create_tmp()
+        try:
+            with f:
+                for chunk in chunks:
+                    f.write(chunk)
+                    yield chunk
+            self._commit(src, ext, path, tmp)
+        finally:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+
+    def get_or_create(self, src, write, ext='.wav'):
+        return self.get(src, ext) or self.put(src, write, ext)
+
+    def prepare_async(self, src, write, ext='.wav'):
+        """后台线程生成缓存（已缓存或正在生成时直接返回），不阻塞调用方"""
+        src = Path(src)
+        key = (str(src), ext)
+        with self._lock:
+            if key in self._pending:
+                return
+            self._pending.add(key)
+
+        def run():
+            try:
+                if self.get(src, ext) is None and self.put(src, write, ext):
+                    self.log(f"已生成转码缓存: {src.name} ({ext[1:]})", "DEBUG")
+            except Exception as e:
+                self.log(f"生成转码缓存失败 ({src.name}): {e}", "WARNING")
+            finally:
+                with self._lock:
+                    self._pending.discard(key)
+
+        threading.Thread(target=run, daemon=True).start()
+
+    def remove(self, name, keep_version=None):
+        """删除某个源文件的缓存；给出 keep_version 时只删除其他版本（源文件改写前）的结果"""
+        prefix = f"{name}."
+        stale = []
+        try:
+            with os.scandir(self.cache_dir) as it:
+                for item in it:
+                    match = item.name.startswith(prefix) and _CACHE_KEY.fullmatch(item.name[len(prefix):])
+                    if match and match.group(1) != keep_version:
+                        stale.append(item.path)
+        except OSError:
+            return
+        for path in stale:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    def evict(self):
+        with self._lock:
+            try:
+                with os.scandir(self.cache_dir) as it:
+                    files = [(item.stat(), item.path) for item in it
+                             if item.is_file() and not item.name.endswith('.tmp')]
+            except OSError:
+                return
+            total = sum(st.st_size for st, _ in files)
+            # 命中时刷新过修改时间，按修改时间从旧到新删除
+            for st, path in sorted(files, key=lambda f: f[0].st_mtime_ns):
+                if total <= self.max_bytes:
+                    break
+                try:
+                    os.remove(path)
+                    total -= st.st_size
+                except OSError:
+                    pass
+
+
+def write_int16(src):
+    """供 TranscodeCache 使用的写入函数：把源文件完整转码为 Int16 WAV"""
+    def write(f):
+        rendition = Int16Rendition(src)
+        for chunk in rendition.iter_range():
+            f.write(chunk)
+    return write
+
+
+def encode_stream(src, fmt, chunk_size=1 << 16):
+    """用 ffmpeg 把 WAV 编码为 ENCODED_FORMATS 中的格式，按块产出编码结果（不在内存中拼出完整输出）。
+
+    生成器被提前关闭（客户端断开）时结束 ffmpeg 进程；编码失败时抛出 RuntimeError。
+    """
+    if FFMPEG_PATH is None:
+        raise RuntimeError("未找到 ffmpeg，无法导出压缩格式")
+    args = ENCODED_FORMATS[fmt][2]
+    proc = subprocess.Popen([FFMPEG_PATH, '-nostdin', '-loglevel', 'error', '-i', str(src), '-vn', *args, 'pipe:1'],
+                            stdin=subprocess.DEVNULL, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+                            creationflags=getattr(subprocess, 'CREATE_NO_WINDOW', 0))
+    try:
+        while True:
+            chunk = tpool.execute(proc.stdout.read, chunk_size) if tpool else proc.stdout.read(chunk_size)
+            if not chunk:
+                break
+            yield chunk
+        if proc.wait() != 0:
+            error = proc.stderr.read().decode('utf-8', 'replace').strip()
+            raise RuntimeError(f"ffmpeg 编码失败: {error.splitlines()[-1] if error else proc.returncode}")
+    finally:
+        if proc.poll() is None:
+            proc.kill()
+            proc.wait()
+        proc.stdout.close()
+        proc.stderr.close()
@@ -0,0 +1,145 @@
+"""WAV 文件读取 - 只解析一次 RIFF 块结构，数据区用 numpy.memmap 映射为类型化视图，按需分页读取。
+
+服务端路由、桌面播放器与波形视图共用这里的解析器；wav_info 按 (路径, 修改时间, 大小)
+缓存头信息，文件列表刷新或反复选中同一文件时每个文件头最多解析一次。
+"""
+
+import os
+import struct
+from functools import lru_cache
+
+import numpy as np
+
+from config import WAV_INFO_CACHE_SIZE
+
+WAVE_FORMAT_PCM = 1
+WAVE_FORMAT_IEEE_FLOAT = 3
+WAVE_FORMAT_EXTENSIBLE = 0xFFFE
+
+_CHUNK = struct.Struct('<4sI')
+_FMT = struct.Struct('<HHIIHH')
+
+
+class WavInfo:
+    """WAV 头信息；format_tag 已把 WAVE_FORMAT_EXTENSIBLE 展开为实际子格式"""
+    __slots__ = ('format_tag', 'channels', 'sample_rate', 'bits_per_sample', 'block_align',
+                 'data_offset', 'data_size')
+
+    def __init__(self, format_tag, channels, sample_rate, bits_per_sample, block_align, data_offset, data_size):
+        self.format_tag = format_tag
+        self.channels = channels
+        self.sample_rate = sample_rate
+        self.bits_per_sample = bits_per_sample
+        self.block_align = block_align
+        self.data_offset = data_offset
+        self.data_size = data_size
+
+    @property
+    def is_float(self):
+        return self.format_tag == WAVE_FORMAT_IEEE_FLOAT
+
+    @property
+    def frames(self):
+        return self.data_size // self.block_align if self.block_align else 0
+
+    @property
+    def duration(self):
+        return self.frames / self.sample_rate if self.sample_rate else 0
+
+    @property
+    def format_name(self):
+        """样本格式简称，如 int16 / int24 / float32 / uint8"""
+        if self.is_float:
+            return f"float{self.bits_per_sample}"
+        if self.bits_per_sample == 8:
+            return "uint8"
+        return f"int{self.bits_per_sample}"
+
+    @property
+    def dtype(self):
+        """样本的 numpy 类型；24-bit 等无法直接映射的格式返回 None"""
+        if self.is_float:
+            return {32: np.dtype('<f4'), 64: np.dtype('<f8')}.get(self.bits_per_sample)
+        if self.format_tag == WAVE_FORMAT_PCM:
+            return {8: np.dtype('u1'), 16: np.dtype('<i2'), 32: np.dtype('<i4')}.get(self.bits_per_sample)
+        return None
+
+
+def read_wav_info(path):
+    """遍历 RIFF 块，返回 WavInfo；不是有效 WAV 时抛出 ValueError"""
+    file_size = os.path.getsize(path)
+    with open(path, 'rb') as f:
+        riff = f.read(12)
+        if len(riff) < 12 or riff[:4] != b'RIFF' or riff[8:12] != b'WAVE':
+            raise ValueError("不是有效的 WAV 文件")
+        fmt = None
+        data = None
+        pos = 12
+        while pos + _CHUNK.size <= file_size:
+            f.seek(pos)
+            chunk_id, chunk_size = _CHUNK.unpack(f.read(_CHUNK.size))
+            body = pos + _CHUNK.size
+            if chunk_id == b'fmt ':
+                fmt = f.read(chunk_size)
+            elif chunk_id == b'data':
+                # 流式录音崩溃或超长文件时长度字段可能不可信，以实际文件大小为准
+                data = (body, min(chunk_size, file_size - body))
+                if fmt is not None:
+                    break
+            # 块长度为奇数时有 1 字节填充
+            pos = body + chunk_size + (chunk_size & 1)
+    if fmt is None or len(fmt) < _FMT.size:
+        raise ValueError("未找到 fmt 块")
+    if data is None:
+        raise ValueError("未找到音频数据")
+    format_tag, channels, sample_rate, _, block_align, bits = _FMT.unpack_from(fmt)
+    if format_tag == WAVE_FORMAT_EXTENSIBLE and len(fmt) >= 26:
+        # 扩展格式：SubFormat GUID 的前两个字节即实际格式码
+        format_tag = struct.unpack_from('<H', fmt, 24)[0]
+    if not block_align:
+        block_align = channels * bits // 8
+    return WavInfo(format_tag, channels, sample_rate, bits, block_align, data[0], data[1])
+
+
+@lru_cache(maxsize=WAV_INFO_CACHE_SIZE)
+def _cached_info(path, mtime_ns, size):
+    return read_wav_info(path)
+
+
+def wav_info(path):
+    """带缓存的 read_wav_info；文件被改写（修改时间或大小变化）后重新解析"""
+    st = os.stat(path)
+    return _cached_info(str(path), st.st_mtime_ns, st.st_size)
+
+
+def memmap_samples(path, info=None):
+    """把数据区映射为只读数组：单声道为一维，多声道为 (帧数, 声道数)，只有被访问的页才会读盘"""
+    if info is None:
+        info = wav_info(path)
+    dtype = info.dtype
+    if dtype is None:
+        raise ValueError(f"不支持的样本格式: {info.bits_per_sample}-bit (格式码 {info.format_tag})")
+    frames = info.frames
+    if frames == 0:
+        samples = np.zeros(0, dtype=dtype)
+    else:
+        samples = np.memmap(path, dtype=dtype, mode='r', offset=info.data_offset, shape=(frames * info.channels,))
+    return samples if info.channels == 1 else samples.reshape(frames, info.channels)
+
+
+def memmap_mono(path):
+    """返回 (单声道样本视图, 采样率)；多声道文件取第一声道"""
+    info = wav_info(path)
+    samples = memmap_samples(path, info)
+    return (samples if samples.ndim == 1 else samples[:, 0]), info.sample_rate
+
+
+def to_float(samples):
+    """类型化样本换算为 ±1.0 的 Float32（只转换传入的片段）"""
+    if samples.dtype == np.uint8:
+        return (samples.astype(np.float32) - 128) * (1.0 / 128)
+    if samples.dtype == np.int16:
+        return samples.astype(np.float32) * (1.0 / 32768)
+    if samples.dtype == np.int32:
+        return samples.astype(np.float32) * (1.0 / 2147483648)
+    return samples.astype(np.float32)
@@ -42,10 +42,83 @@ FORMAT_FLOAT32 = pyaudio.paFloat32
 CHANNELS = 1
 RATE = 44100
 
+# 监听/虚拟麦克风输出缓冲的目标延迟（毫秒），越小延迟越低、越容易欠载
+OUTPUT_TARGET_LATENCY_MS = 60
+# 低延迟输出：PyAudio 回调模式 + 更小的设备缓冲
+OUTPUT_LOW_LATENCY = True
+LOW_LATENCY_CHUNK = 256
+# 自适应抖动缓冲：按测得的网络抖动自动伸缩缓冲深度（默认开启）
+OUTPUT_ADAPTIVE_LATENCY = True
+ADAPTIVE_LATENCY_MIN_MS = 20
+ADAPTIVE_LATENCY_MAX_MS = 300
+
+# 多客户端混音：块长（样本）、开始混入前的预缓冲块数、单路最大积压块数、
+# 判定客户端仍在发送的时间窗（秒）
+MIXER_BLOCK_SIZE = 1024
+MIXER_PRIME_BLOCKS = 2
+MIXER_MAX_BACKLOG_BLOCKS = 8
+MIXER_ACTIVE_WINDOW = 1.0
+# 手机端设置的单路混音增益上限（线性倍数）
+MIX_GAIN_MAX = 2.0
+
+# 可视化抽头：每组抽取样本数、包络环时长（秒）、电平环槽数；界面定时器从中取数
+TAP_DECIMATION = 64
+TAP_RING_SECONDS = 2
+TAP_LEVEL_SLOTS = 128
+
+# 丢包补偿：按包头序号发现丢包后，用上一包逐包衰减填补的最大包数及每包衰减系数
+PLC_MAX_PACKETS = 3
+PLC_FADE = 0.5
+# 包头采样率的有效范围（Hz），超出范围的包整包丢弃
+PACKET_MIN_SAMPLE_RATE = 8000
+PACKET_MAX_SAMPLE_RATE = 192000
+
+# Opus 压缩传输（手机端 WebCodecs 编码，服务端需安装 opuslib 及 libopus）
+OPUS_SAMPLE_RATE = 48000
+OPUS_DEFAULT_BITRATE = 64000
+# 手机端可选码率范围（bit/s），客户端请求的码率截断到该范围
+OPUS_MIN_BITRATE = 24000
+OPUS_MAX_BITRATE = 128000
+
+# 录音边收边写盘（关闭则沿用内存缓存、停止时一次性保存）
+RECORD_STREAM_TO_DISK = True
+# 流式录音回填文件头并落盘的间隔（秒），即崩溃时最多丢失的时长
+RECORD_FLUSH_INTERVAL = 2
+# 分轨录音：多台手机同时录制时每个客户端额外保存一个独立音轨（默认关闭）
+RECORD_MULTITRACK = False
+# 分轨落后录制时钟超过该时长（秒）时补静音对齐
+RECORD_MULTITRACK_GAP_TOLERANCE = 0.25
+# 波形峰值金字塔：各层每组样本数（须为首层的整数倍），与 WAV 同名的旁路文件后缀
+PEAK_LEVELS = (256, 4096, 65536)
+PEAK_FILE_SUFFIX = ".peaks"
+# 服务端在内存中保留的峰值金字塔个数（1 小时录音约 3MB）
+PEAK_CACHE_SIZE = 16
+# 录音时顺带生成峰值旁路文件，打开录音时无需解码整段音频
+RECORD_PEAKS = True
+# WAV 头信息缓存条数（按 路径/修改时间/大小 缓存，文件变化后自动失效）
+WAV_INFO_CACHE_SIZE = 1024
+# 录音目录索引（SQLite，隐藏文件，存放于录音目录内）：文件列表不再逐个打开 WAV 读头
+CATALOG_FILE_NAME = ".recordings.db"
+
 # ========== 网络设置 ==========
 DEFAULT_PORT = 5001
 MIN_PORT = 1024
 MAX_PORT = 65535
+# 音频帧改走独立的裸 WebSocket（控制事件仍走 Socket.IO），不可用时客户端自动退回 audio_data 事件
+AUDIO_WS_ENABLED = True
+AUDIO_WS_PATH = "/ws/audio"
+# 手机端录音列表分页：默认每页条数与单页上限
+AUDIO_LIST_PAGE_SIZE = 50
+AUDIO_LIST_MAX_PAGE_SIZE = 500
+# 手机端播放浏览器不支持的格式（Float32）时按需转码，每块样本数（输出 Int16 为 2 字节/样本）
+TRANSCODE_CHUNK_SAMPLES = 1 << 16
+# 转码结果的磁盘缓存（位于配置目录下），总大小超过上限时淘汰最久未访问的文件
+TRANSCODE_CACHE_DIR_NAME = "transcode_cache"
+TRANSCODE_CACHE_MAX_BYTES = 2 * 1024 * 1024 * 1024
+# 下载可选 FLAC/Opus/MP3（需要 ffmpeg 可执行文件，可填完整路径），编码结果同样存入转码缓存
+FFMPEG_BINARY = "ffmpeg"
+DOWNLOAD_OPUS_BITRATE = "128k"
+DOWNLOAD_MP3_BITRATE = "192k"
 
 # ========== UI 设置 ==========
 LOG_DISPLAY_HEIGHT = 6
@@ -1,4 +1,5 @@
 from .cert import generate_cert
 from .routes import register_routes
+from .audio_ws import wrap_audio_ws
 
-__all__ = ["generate_cert", "register_routes"]
+__all__ = ["generate_cert", "register_routes", "wrap_audio_ws"]
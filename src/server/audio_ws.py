@@ -0,0 +1,55 @@
+"""裸 WebSocket 音频通道 - 只承载音频帧，绕过 Socket.IO 的包解析与事件分发"""
+
+from urllib.parse import parse_qs
+
+from config import AUDIO_WS_PATH
+
+
+def wrap_audio_ws(ctx, wsgi_app):
+    """返回一个 WSGI 应用：AUDIO_WS_PATH 交给裸 WebSocket 处理，其余请求仍走 Flask。
+
+    手机端先建立 Socket.IO 连接（控制事件照旧走 Socket.IO），再以自己的
+    Socket.IO sid 打开 AUDIO_WS_PATH?sid=...，之后每个二进制消息就是一个
+    带包头的音频包，直接交给 AudioEngine.write_audio，与 audio_data 事件
+    共用同一条处理链路（混音、分轨、丢包补偿均按该 sid 进行）。
+    eventlet 不可用时原样返回 wsgi_app，客户端连接失败后自动退回 audio_data 事件。
+    """
+    try:
+        from eventlet import websocket
+    except ImportError:
+        ctx.log("eventlet.websocket 不可用，音频仅通过 Socket.IO 传输", "WARNING")
+        return wsgi_app
+
+    @websocket.WebSocketWSGI
+    def audio_socket(ws):
+        query = parse_qs(ws.environ.get('QUERY_STRING', ''))
+        sid = (query.get('sid') or [None])[0]
+        if not sid or not _is_socketio_client(ctx.socketio, sid):
+            ctx.log(f"拒绝音频通道连接: 未知 sid {sid}", "WARNING")
+            return
+        ctx.log(f"客户端 {sid} 已启用裸 WebSocket 音频通道", "DEBUG")
+        write_audio = ctx.audio_engine.write_audio
+        while True:
+            try:
+                message = ws.wait()
+            except Exception:
+                break
+            if message is None:
+                break
+            if isinstance(message, (bytes, bytearray)):
+                write_audio(message, sid)
+        ctx.log(f"客户端 {sid} 音频通道已关闭", "DEBUG")
+
+    def app(environ, start_response):
+        if environ.get('PATH_INFO') == AUDIO_WS_PATH:
+            return audio_socket(environ, start_response)
+        return wsgi_app(environ, start_response)
+
+    return app
+
+
+def _is_socketio_client(socketio, sid):
+    try:
+        return socketio.server.manager.is_connected(sid, '/')
+    except Exception:
+        return False
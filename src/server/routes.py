@@ -1,13 +1,25 @@
 """Flask 路由 + SocketIO 事件注册"""
 
-import io
-import wave
-import struct
-from datetime import datetime
+import base64
+import json
+import math
+import zipfile
+from datetime import datetime, timedelta, timezone
+from itertools import chain
 from pathlib import Path
+from urllib.parse import quote
 
 import numpy as np
 from flask import render_template, request, jsonify, send_file, abort, Response
+from werkzeug.exceptions import HTTPException
+
+from config import (AUDIO_WS_ENABLED, AUDIO_WS_PATH, OPUS_DEFAULT_BITRATE, OPUS_MIN_BITRATE, OPUS_MAX_BITRATE,
+                    AUDIO_LIST_PAGE_SIZE, AUDIO_LIST_MAX_PAGE_SIZE)
+from audio.codec import OPUS_AVAILABLE
+from audio.peaks import cached_peaks, remove_peaks
+from audio.transcode import Int16Rendition, write_int16, encode_stream, ENCODED_FORMATS, FFMPEG_PATH
+from audio.wavfile import wav_info
+from server.zipstream import zip_stream
 
 
 def _format_file_size(size_bytes):
@@ -35,129 +47,124 @@ def _format_duration(duration_seconds):
         return f"{hours}时{mins}分{secs}秒"
 
 
-def _get_wav_duration(filepath):
-    """获取 WAV 文件时长，支持标准和 Float32 格式"""
+def _to_db(level):
+    """满幅比例换算为 dBFS（保留 1 位小数），静音返回 None"""
+    return round(20 * math.log10(level), 1) if level > 0 else None
+
+
+# 列表排序字段；同值时再按文件名排序，保证游标位置唯一
+_LIST_SORT_KEYS = {
+    'mtime': lambda e: e.mtime_ns,
+    'name': lambda e: e.name,
+    'duration': lambda e: e.duration,
+    'size': lambda e: e.size,
+}
+
+
+def _parse_list_date(value, end=False):
+    """解析 YYYY-MM-DD 或 YYYY-MM-DD HH:MM:SS；只给日期且作为结束时间时取当天结束（不含次日零点）"""
+    if not value:
+        return None
     try:
-        with wave.open(str(filepath), 'rb') as wf:
-            frames = wf.getnframes()
-            rate = wf.getframerate()
-            return frames / rate if rate > 0 else 0
-    except wave.Error:
-        try:
-            with open(str(filepath), 'rb') as f:
-                riff = f.read(4)
-                if riff != b'RIFF':
-                    return 0
-                f.read(4)
-                wave_id = f.read(4)
-                if wave_id != b'WAVE':
-                    return 0
-                sample_rate = 44100
-                channels = 1
-                bits_per_sample = 32
-                data_size = 0
-                while True:
-                    chunk_id = f.read(4)
-                    if len(chunk_id) < 4:
-                        break
-                    chunk_size = struct.unpack('<I', f.read(4))[0]
-                    if chunk_id == b'fmt ':
-                        fmt_start = f.tell()
-                        f.read(2)  # audio_format
-                        channels = struct.unpack('<H', f.read(2))[0]
-                        sample_rate = struct.unpack('<I', f.read(4))[0]
-                        f.read(4)  # byte_rate
-                        f.read(2)  # block_align
-                        bits_per_sample = struct.unpack('<H', f.read(2))[0]
-                        remaining = chunk_size - (f.tell() - fmt_start)
-                        if remaining > 0:
-                            f.read(remaining)
-                    elif chunk_id == b'data':
-                        data_size = chunk_size
-                        break
-                    else:
-                        f.read(chunk_size)
-                if sample_rate > 0 and data_size > 0:
-                    bytes_per_frame = (bits_per_sample // 8) * channels
-                    total_frames = data_size // bytes_per_frame
-                    return total_frames / sample_rate
-        except:
-            pass
-    return 0
-
-
-def _is_float32_wav(filepath):
-    """检测 WAV 文件是否为 Float32 (IEEE) 格式"""
+        return datetime.strptime(value, "%Y-%m-%d %H:%M:%S").timestamp()
+    except ValueError:
+        day = datetime.strptime(value, "%Y-%m-%d")
+        return (day + timedelta(days=1) if end else day).timestamp()
+
+
+def _encode_cursor(key):
+    return base64.urlsafe_b64encode(json.dumps(key).encode()).decode().rstrip('=')
+
+
+def _decode_cursor(cursor):
+    """游标为上一页最后一条的 (排序值, 文件名)，无效时抛出 ValueError"""
     try:
-        with wave.open(str(filepath), 'rb'):
-            return False  # 标准 wave 模块能打开，说明不是 Float32
-    except wave.Error:
+        key = json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+    except (ValueError, TypeError) as e:
+        raise ValueError("无效的游标") from e
+    if not isinstance(key, list) or len(key) != 2:
+        raise ValueError("无效的游标")
+    return tuple(key)
+
+
+def _query_audio_list(entries, args):
+    """按请求参数过滤、排序并分页，返回 (本页记录, 下一页游标或 None, 过滤后总数)
+
+    参数：sort=mtime|name|duration|size（默认 mtime），order=desc|asc（默认 desc），
+    from/to 修改时间范围，min_duration 最短时长（秒），format 逗号分隔的格式（如 int16,float32），
+    limit 每页条数，cursor 上一页返回的 next_cursor。
+    """
+    sort = args.get('sort', 'mtime')
+    if sort not in _LIST_SORT_KEYS:
+        raise ValueError(f"不支持的排序字段: {sort}")
+    descending = args.get('order', 'desc') != 'asc'
+    start = _parse_list_date(args.get('from'))
+    end = _parse_list_date(args.get('to'), end=True)
+    min_duration = args.get('min_duration', 0, type=float)
+    formats = {f for f in args.get('format', '').split(',') if f}
+    limit = min(max(args.get('limit', AUDIO_LIST_PAGE_SIZE, type=int), 1), AUDIO_LIST_MAX_PAGE_SIZE)
+
+    if start is not None:
+        entries = [e for e in entries if e.mtime >= start]
+    if end is not None:
+        entries = [e for e in entries if e.mtime < end]
+    if min_duration > 0:
+        entries = [e for e in entries if e.duration >= min_duration]
+    if formats:
+        entries = [e for e in entries if e.format in formats]
+
+    sort_value = _LIST_SORT_KEYS[sort]
+
+    def key(e):
+        return sort_value(e), e.name
+
+    entries = sorted(entries, key=key, reverse=descending)
+    first = 0
+    cursor = args.get('cursor')
+    if cursor:
+        after = _decode_cursor(cursor)
+        # 按键定位而不是按偏移，翻页期间有新录音或删除时不会重复或漏掉
         try:
-            with open(str(filepath), 'rb') as f:
-                riff = f.read(4)
-                f.read(4)
-                wave_id = f.read(4)
-                if riff != b'RIFF' or wave_id != b'WAVE':
-                    return False
-                while True:
-                    chunk_id = f.read(4)
-                    if len(chunk_id) < 4:
-                        break
-                    chunk_size = struct.unpack('<I', f.read(4))[0]
-                    if chunk_id == b'fmt ':
-                        audio_format = struct.unpack('<H', f.read(2))[0]
-                        f.read(2)  # channels
-                        f.read(4)  # sample_rate
-                        f.read(4)  # byte_rate
-                        f.read(2)  # block_align
-                        bits = struct.unpack('<H', f.read(2))[0]
-                        return audio_format == 3 and bits == 32
-                    else:
-                        f.read(chunk_size)
-        except:
-            pass
-    return False
-
-
-def _convert_float32_to_int16(filepath):
-    """将 Float32 WAV 转换为 Int16 WAV，返回 BytesIO 对象"""
-    with open(str(filepath), 'rb') as f:
-        f.read(12)  # RIFF + size + WAVE
-        sample_rate = 44100
-        channels = 1
-        raw_data = None
-        while True:
-            chunk_id = f.read(4)
-            if len(chunk_id) < 4:
-                break
-            chunk_size = struct.unpack('<I', f.read(4))[0]
-            if chunk_id == b'fmt ':
-                f.read(2)  # audio_format
-                channels = struct.unpack('<H', f.read(2))[0]
-                sample_rate = struct.unpack('<I', f.read(4))[0]
-                remaining = chunk_size - 8
-                if remaining > 0:
-                    f.read(remaining)
-            elif chunk_id == b'data':
-                raw_data = f.read(chunk_size)
-                break
-            else:
-                f.read(chunk_size)
+            first = next((i for i, e in enumerate(entries) if (key(e) < after if descending else key(e) > after)),
+                         len(entries))
+        except TypeError as e:
+            # 游标来自另一种排序方式
+            raise ValueError("无效的游标") from e
+    page = entries[first:first + limit]
+    has_more = first + limit < len(entries)
+    return page, (_encode_cursor(key(page[-1])) if has_more else None), len(entries)
 
-    if raw_data is None:
-        raise ValueError("未找到音频数据")
 
-    float_array = np.frombuffer(raw_data, dtype=np.float32)
-    int16_array = (np.clip(float_array, -1.0, 1.0) * 32767).astype(np.int16)
+def _byte_range_response(size, iter_range, mimetype, etag, last_modified):
+    """按 Range 请求头返回 206 部分内容（无 Range 时 200 全量），内容由 iter_range(start, stop) 分块生成
 
-    buf = io.BytesIO()
-    with wave.open(buf, 'wb') as wf:
-        wf.setnchannels(channels)
-        wf.setsampwidth(2)
-        wf.setframerate(sample_rate)
-        wf.writeframes(int16_array.tobytes())
-    buf.seek(0)
-    return buf
+    etag 须随内容变化（如源文件的 mtime_ns 与大小），last_modified 为带时区的 UTC 时间；
+    If-Range 不匹配时退回全量响应。
+    """
+    last_modified = last_modified.replace(microsecond=0)
+    if_range = request.if_range
+    if if_range.etag is not None:
+        range_valid = if_range.etag == etag
+    elif if_range.date is not None:
+        range_valid = if_range.date == last_modified
+    else:
+        range_valid = True
+    byte_range = None
+    # 多段 Range 不支持（浏览器播放器不会发出），按全量返回
+    if request.range is not None and len(request.range.ranges) == 1 and range_valid:
+        byte_range = request.range.range_for_length(size)
+        if byte_range is None:
+            return Response(status=416, headers={'Content-Range': f'bytes */{size}', 'Accept-Ranges': 'bytes'})
+    start, stop = byte_range or (0, size)
+    response = Response(iter_range(start, stop), status=206 if byte_range else 200, mimetype=mimetype,
+                        direct_passthrough=True)
+    response.content_length = stop - start
+    response.headers['Accept-Ranges'] = 'bytes'
+    if byte_range:
+        response.headers['Content-Range'] = f'bytes {start}-{stop - 1}/{size}'
+    response.set_etag(etag)
+    response.last_modified = last_modified
+    return response
 
 
 def register_routes(ctx):
@@ -165,7 +172,7 @@ def register_routes(ctx):
     注册所有 Flask 路由和 SocketIO 事件。
 
     ctx 是一个对象，需要提供以下属性：
-        flask_app, socketio, record_dir, audio_engine,
+        flask_app, socketio, record_dir, catalog, transcode_cache, audio_engine,
         config, is_recording, connected_clients, mic_active_clients,
         log (日志回调), schedule_ui (在UI线程执行回调),
         on_connect, on_disconnect, on_toggle_recording,
@@ -184,22 +191,36 @@ def register_routes(ctx):
     @app.route('/api/audio/list')
     def get_audio_list():
         try:
+            # 录音目录索引只 stat 比对，未变化的文件不再打开读头
+            entries = ctx.catalog.entries()
+            # 弱 ETag 取自目录状态：目录没有变化时直接返回 304，不再生成 JSON
+            etag = ctx.catalog.state
+            if request.if_none_match.contains_weak(etag):
+                response = Response(status=304)
+                response.set_etag(etag, weak=True)
+                return response
+            try:
+                page, next_cursor, total = _query_audio_list(entries, request.args)
+            except ValueError as e:
+                return jsonify({'success': False, 'error': str(e)}), 400
             audio_files = []
-            wav_files = sorted(ctx.record_dir.glob("*.wav"), key=lambda x: x.stat().st_mtime, reverse=True)
-            for wav_file in wav_files:
-                filename = wav_file.name
-                file_stat = wav_file.stat()
-                mtime = datetime.fromtimestamp(file_stat.st_mtime)
-                duration = _get_wav_duration(wav_file)
+            for entry in page:
                 audio_files.append({
-                    'filename': filename,
-                    'size': file_stat.st_size,
-                    'size_str': _format_file_size(file_stat.st_size),
-                    'mtime': mtime.strftime("%Y-%m-%d %H:%M:%S"),
-                    'duration': duration,
-                    'duration_str': _format_duration(duration)
+                    'filename': entry.name,
+                    'size': entry.size,
+                    'size_str': _format_file_size(entry.size),
+                    'mtime': datetime.fromtimestamp(entry.mtime).strftime("%Y-%m-%d %H:%M:%S"),
+                    'duration': entry.duration,
+                    'duration_str': _format_duration(entry.duration),
+                    'format': entry.format,
+                    'peak': entry.peak
                 })
-            return jsonify({'success': True, 'files': audio_files})
+            response = jsonify({'success': True, 'files': audio_files, 'next_cursor': next_cursor, 'total': total,
+                                'download_formats': ['wav'] + (list(ENCODED_FORMATS) if FFMPEG_PATH else [])})
+            response.set_etag(etag, weak=True)
+            # 允许缓存但每次须带 If-None-Match 重新验证
+            response.headers['Cache-Control'] = 'no-cache'
+            return response
         except Exception as e:
             ctx.log(f"获取音频列表失败: {e}", "ERROR")
             return jsonify({'success': False, 'error': str(e)}), 500
@@ -212,18 +233,28 @@ def register_routes(ctx):
             filepath = ctx.record_dir / filename
             if not filepath.exists():
                 abort(404, description="File not found")
-            ctx.log(f"手机端播放音频: {filename}", "INFO")
-            # Float32 WAV 浏览器不支持，转换为 Int16 再返回
-            if _is_float32_wav(filepath):
-                ctx.log(f"检测到 Float32 格式，转换为 Int16 后返回 (size: orig={filepath.stat().st_size})", "INFO")
-                buf = _convert_float32_to_int16(filepath)
-                data = buf.read()
-                ctx.log(f"转换完成，返回 {len(data)} bytes", "INFO")
-                return Response(data, mimetype='audio/wav', headers={
-                    'Content-Length': len(data),
-                    'Cache-Control': 'no-cache, no-store',
-                })
+            # 拖动进度条时浏览器会发出多次 Range 请求，只在从头请求时记录日志
+            if request.range is None or request.range.ranges[0][0] == 0:
+                ctx.log(f"手机端播放音频: {filename}", "INFO")
+            # Float32 WAV 浏览器不支持：有转码缓存时直接按文件发送，
+            # 否则按请求的字节区间边读边转换为 Int16，同时在后台生成缓存供下次使用
+            info = wav_info(filepath)
+            if info.is_float:
+                st = filepath.stat()
+                # 两条路径发送的字节相同，都以源文件版本作 ETag（缓存文件的 mtime 会随 LRU 访问更新）
+                etag = f"{st.st_mtime_ns:x}-{st.st_size:x}"
+                cached = ctx.transcode_cache.get(filepath)
+                if cached is not None:
+                    return send_file(str(cached), mimetype='audio/wav', as_attachment=False, download_name=filename,
+                                     conditional=True, etag=etag, last_modified=st.st_mtime)
+                ctx.transcode_cache.prepare_async(filepath, write_int16(filepath))
+                rendition = Int16Rendition(filepath, info)
+                return _byte_range_response(rendition.size, rendition.iter_range, 'audio/wav', etag,
+                                            datetime.fromtimestamp(st.st_mtime, timezone.utc))
             return send_file(str(filepath), mimetype='audio/wav', as_attachment=False, download_name=filename)
+        except HTTPException:
+            # abort() 及 send_file 的 416 等状态原样返回，不当作服务器错误
+            raise
         except Exception as e:
             ctx.log(f"播放音频失败: {e}", "ERROR")
             abort(500, description=str(e))
@@ -236,12 +267,101 @@ def register_routes(ctx):
             filepath = ctx.record_dir / filename
             if not filepath.exists():
                 abort(404, description="File not found")
-            ctx.log(f"手机端下载音频: {filename}", "INFO")
-            return send_file(str(filepath), mimetype='audio/wav', as_attachment=True, download_name=filename)
+            fmt = request.args.get('format', 'wav')
+            if fmt == 'wav':
+                ctx.log(f"手机端下载音频: {filename}", "INFO")
+                return send_file(str(filepath), mimetype='audio/wav', as_attachment=True, download_name=filename)
+            if fmt not in ENCODED_FORMATS:
+                return jsonify({'success': False, 'error': f'不支持的格式: {fmt}'}), 400
+            if FFMPEG_PATH is None:
+                return jsonify({'success': False, 'error': '服务器未安装 ffmpeg，只能下载 WAV'}), 501
+            ext, mimetype, _ = ENCODED_FORMATS[fmt]
+            download_name = filepath.stem + ext
+            ctx.log(f"手机端下载音频: {filename} ({fmt})", "INFO")
+            cached = ctx.transcode_cache.get(filepath, ext)
+            if cached is not None:
+                # 缓存文件的 mtime 会随 LRU 访问更新，ETag 取源文件版本
+                st = filepath.stat()
+                return send_file(str(cached), mimetype=mimetype, as_attachment=True, download_name=download_name,
+                                 conditional=True, etag=f"{st.st_mtime_ns:x}-{st.st_size:x}-{fmt}",
+                                 last_modified=st.st_mtime)
+            # 边编码边发送（分块传输），完整发送后编码结果写入缓存，下次直接按文件发送
+            stream = ctx.transcode_cache.tee(filepath, encode_stream(filepath, fmt), ext)
+            # 先取第一块：编码器无法启动（如 ffmpeg 缺少对应编码库）时在这里报错，而不是发出一个空文件
+            first = next(stream, b'')
+            return Response(chain([first], stream), mimetype=mimetype, headers={
+                'Content-Disposition': f"attachment; filename*=UTF-8''{quote(download_name)}",
+            })
+        except HTTPException:
+            raise
         except Exception as e:
             ctx.log(f"下载音频失败: {e}", "ERROR")
             abort(500, description=str(e))
 
+    @app.route('/api/audio/export')
+    def export_audio():
+        """批量导出为 ZIP：files=<文件名>（可重复）或 from/to 修改时间范围（格式同列表接口）；
+        format=wav|flac|opus|mp3 同下载接口，compression=stored|deflate（默认 stored，音频数据压缩率很低）。
+        压缩包边生成边以分块传输发送，不在内存或磁盘中缓存。
+        """
+        try:
+            names = request.args.getlist('files')
+            if any('..' in n or '/' in n or '\\' in n for n in names):
+                return jsonify({'success': False, 'error': 'Invalid filename'}), 400
+            fmt = request.args.get('format', 'wav')
+            if fmt != 'wav' and fmt not in ENCODED_FORMATS:
+                return jsonify({'success': False, 'error': f'不支持的格式: {fmt}'}), 400
+            if fmt != 'wav' and FFMPEG_PATH is None:
+                return jsonify({'success': False, 'error': '服务器未安装 ffmpeg，只能导出 WAV'}), 501
+            compression = {'stored': zipfile.ZIP_STORED, 'deflate': zipfile.ZIP_DEFLATED}.get(
+                request.args.get('compression', 'stored'))
+            if compression is None:
+                return jsonify({'success': False, 'error': '不支持的压缩方式'}), 400
+            try:
+                start = _parse_list_date(request.args.get('from'))
+                end = _parse_list_date(request.args.get('to'), end=True)
+            except ValueError as e:
+                return jsonify({'success': False, 'error': str(e)}), 400
+
+            entries = ctx.catalog.entries()
+            if names:
+                wanted = set(names)
+                entries = [e for e in entries if e.name in wanted]
+            elif start is not None or end is not None:
+                entries = [e for e in entries
+                           if (start is None or e.mtime >= start) and (end is None or e.mtime < end)]
+            else:
+                return jsonify({'success': False, 'error': '请指定文件或日期范围'}), 400
+            if not entries:
+                return jsonify({'success': False, 'error': '没有符合条件的录音'}), 404
+            # 按录制先后排列
+            entries.reverse()
+
+            def members():
+                for entry in entries:
+                    filepath = ctx.record_dir / entry.name
+                    if fmt == 'wav':
+                        yield entry.name, filepath, entry.mtime
+                        continue
+                    ext = ENCODED_FORMATS[fmt][0]
+                    cached = ctx.transcode_cache.get(filepath, ext)
+                    source = cached if cached is not None else \
+                        ctx.transcode_cache.tee(filepath, encode_stream(filepath, fmt), ext)
+                    yield filepath.stem + ext, source, entry.mtime
+
+            if names:
+                archive = f"recordings_{len(entries)}.zip" if len(entries) > 1 else f"{Path(entries[0].name).stem}.zip"
+            else:
+                dates = [request.args.get(k, '').split(' ')[0] for k in ('from', 'to')]
+                archive = "_".join(["recordings"] + [d for d in dates if d]) + ".zip"
+            ctx.log(f"手机端批量导出 {len(entries)} 个录音 ({fmt})", "INFO")
+            return Response(zip_stream(members(), compression), mimetype='application/zip', headers={
+                'Content-Disposition': f"attachment; filename*=UTF-8''{quote(archive)}",
+            })
+        except Exception as e:
+            ctx.log(f"批量导出失败: {e}", "ERROR")
+            return jsonify({'success': False, 'error': str(e)}), 500
+
     @app.route('/api/audio/delete/<filename>', methods=['DELETE'])
     def delete_audio(filename):
         try:
@@ -260,12 +380,38 @@ def register_routes(ctx):
                 filepath.unlink()
                 ctx.log(f"手机端永久删除音频: {filename}", "WARNING")
 
+            remove_peaks(filepath)
+            ctx.catalog.remove(filename)
+            ctx.transcode_cache.remove(filename)
+
             ctx.schedule_ui(ctx.refresh_file_list)
             return jsonify({'success': True, 'message': f'已删除 {filename}'})
         except Exception as e:
             ctx.log(f"删除音频失败: {e}", "ERROR")
             return jsonify({'success': False, 'error': str(e)}), 500
 
+    @app.route('/api/audio/peaks/<filename>')
+    def get_audio_peaks(filename):
+        """返回录音的波形概览（优先读取录音时生成的 .peaks 旁路文件，没有时由内存映射的样本生成一次）"""
+        try:
+            if '..' in filename or '/' in filename or '\\' in filename:
+                return jsonify({'success': False, 'error': 'Invalid filename'}), 400
+            filepath = ctx.record_dir / filename
+            if not filepath.exists():
+                return jsonify({'success': False, 'error': 'File not found'}), 404
+            pyramid = cached_peaks(filepath)
+            points = min(max(request.args.get('points', 800, type=int), 1), 4000)
+            mins, maxs = pyramid.overview(points)
+            return jsonify({
+                'success': True,
+                'duration': pyramid.total_frames / pyramid.sample_rate if pyramid.sample_rate else 0,
+                'mins': np.round(mins.astype(np.float64), 3).tolist(),
+                'maxs': np.round(maxs.astype(np.float64), 3).tolist(),
+            })
+        except Exception as e:
+            ctx.log(f"获取波形峰值失败: {e}", "ERROR")
+            return jsonify({'success': False, 'error': str(e)}), 500
+
     @app.route('/api/audio/info/<filename>')
     def get_audio_info(filename):
         try:
@@ -275,23 +421,41 @@ def register_routes(ctx):
             if not filepath.exists():
                 return jsonify({'success': False, 'error': 'File not found'}), 404
             file_stat = filepath.stat()
-            with wave.open(str(filepath), 'rb') as wf:
-                channels = wf.getnchannels()
-                sample_width = wf.getsampwidth()
-                frame_rate = wf.getframerate()
-                n_frames = wf.getnframes()
-                duration = n_frames / frame_rate if frame_rate > 0 else 0
+            # 文件头走共享解析器的缓存（支持 PCM / IEEE 浮点 / WAVE_FORMAT_EXTENSIBLE）
+            try:
+                header = wav_info(filepath)
+            except ValueError as e:
+                return jsonify({'success': False, 'error': str(e)}), 415
             info = {
                 'filename': filename,
                 'size': file_stat.st_size,
                 'size_str': _format_file_size(file_stat.st_size),
                 'mtime': datetime.fromtimestamp(file_stat.st_mtime).strftime("%Y-%m-%d %H:%M:%S"),
-                'duration': duration,
-                'duration_str': _format_duration(duration),
-                'channels': channels,
-                'sample_rate': frame_rate,
-                'bit_depth': sample_width * 8
+                'duration': header.duration,
+                'duration_str': _format_duration(header.duration),
+                'channels': header.channels,
+                'sample_rate': header.sample_rate,
+                'bit_depth': header.bits_per_sample,
+                'format': header.format_name,
             }
+            # 电平统计与预览波形取自峰值金字塔（录音时已生成的旁路文件，内存中另有缓存）；
+            # 24-bit 等无法内存映射的格式没有统计
+            points = min(max(request.args.get('points', 200, type=int), 0), 4000)
+            try:
+                pyramid = cached_peaks(filepath)
+            except ValueError:
+                pyramid = None
+            if pyramid is not None:
+                info.update({
+                    'peak': round(pyramid.peak, 4),
+                    'peak_db': _to_db(pyramid.peak),
+                    'rms': round(pyramid.rms, 4),
+                    'rms_db': _to_db(pyramid.rms),
+                })
+                if points:
+                    mins, maxs = pyramid.overview(points)
+                    info['mins'] = np.round(mins.astype(np.float64), 3).tolist()
+                    info['maxs'] = np.round(maxs.astype(np.float64), 3).tolist()
             return jsonify({'success': True, 'info': info})
         except Exception as e:
             ctx.log(f"获取音频信息失败: {e}", "ERROR")
@@ -301,7 +465,7 @@ def register_routes(ctx):
 
     @socketio.on('audio_data')
     def handle_audio(data):
-        ctx.audio_engine.write_audio(data)
+        ctx.audio_engine.write_audio(data, request.sid)
 
     @socketio.on('connect')
     def handle_connect():
@@ -309,6 +473,8 @@ def register_routes(ctx):
         ctx.on_connect(request.remote_addr, request.sid)
         emit('recording_status', {'is_recording': ctx.is_recording})
         emit('native_mode_status', {'enabled': ctx.audio_engine.is_float32_mode})
+        emit('audio_transport', {'ws_path': AUDIO_WS_PATH if AUDIO_WS_ENABLED else None,
+                                 'codecs': ['pcm', 'opus'] if OPUS_AVAILABLE else ['pcm']})
 
     @socketio.on('disconnect')
     def handle_disconnect():
@@ -327,17 +493,50 @@ def register_routes(ctx):
         from flask_socketio import emit
         emit('recording_status', {'is_recording': ctx.is_recording})
 
+    def _negotiate_codec(data):
+        """data 中带 codec 时登记该客户端的编码并回复服务端实际采用的编码。
+
+        未知编码按 PCM 处理；码率非有限数值时取默认值，否则截断到 [OPUS_MIN_BITRATE, OPUS_MAX_BITRATE]。
+        """
+        from flask_socketio import emit
+        codec = data.get('codec')
+        if codec:
+            if codec not in ('pcm', 'opus'):
+                codec = 'pcm'
+            bitrate = data.get('bitrate')
+            if isinstance(bitrate, bool) or not isinstance(bitrate, (int, float)) or not math.isfinite(bitrate):
+                bitrate = OPUS_DEFAULT_BITRATE
+            bitrate = int(min(max(bitrate, OPUS_MIN_BITRATE), OPUS_MAX_BITRATE))
+            codec = ctx.audio_engine.set_client_codec(request.sid, codec, bitrate)
+            emit('codec_status', {'codec': codec, 'bitrate': bitrate})
+
     @socketio.on('set_native_mode')
     def handle_set_native_mode(data):
         enabled = data.get('enabled', False)
         ctx.audio_engine.set_float32_mode(enabled)
         ctx.log(f"手机端切换原生模式: {'开启' if enabled else '关闭'}", "INFO")
+        _negotiate_codec(data)
 
     @socketio.on('update_config')
     def handle_update_config(data):
         sample_rate = data.get('sampleRate')
         if sample_rate:
             ctx.schedule_ui(lambda: ctx.audio_engine.set_input_sample_rate(int(sample_rate)))
+        _negotiate_codec(data)
+
+    @socketio.on('set_mix_gain')
+    def handle_set_mix_gain(data):
+        from flask_socketio import emit
+        gain = ctx.audio_engine.set_client_gain(request.sid, data.get('gain') if isinstance(data, dict) else None)
+        if gain is None:
+            ctx.log(f"忽略无效的混音增益: {data!r}", "WARNING")
+            return
+        emit('mix_gain_status', {'gain': gain})
+
+    @socketio.on('latency_probe')
+    def handle_latency_probe():
+        # 客户端通过 ack 往返时间估算网络单程延迟
+        return True
 
     @socketio.on('mic_status')
     def handle_mic_status(data):
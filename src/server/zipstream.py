@@ -0,0 +1,89 @@
+"""流式 ZIP - 边读源文件边产出压缩包字节，整个压缩包既不在内存中也不落盘"""
+
+import io
+import os
+import zipfile
+from datetime import datetime
+
+
+class _StreamBuffer(io.RawIOBase):
+    """zipfile 的输出目标：只记录写入的字节供生成器取走；不可 seek，zipfile 因此改用数据描述符记录 CRC 与大小"""
+
+    def __init__(self):
+        super().__init__()
+        self._chunks = []
+        self._pos = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        self._pos += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._pos
+
+    def drain(self):
+        data = b''.join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def _write_member(zf, buf, info, chunks):
+    """写入一个成员，每写一块就把已产生的压缩包字节交出去"""
+    with zf.open(info, 'w') as dst:
+        for chunk in chunks:
+            dst.write(chunk)
+            data = buf.drain()
+            if data:
+                yield data
+
+
+def _date_time(mtime):
+    """修改时间（秒）转为 ZIP 时间字段；ZIP 只能表示 1980～2107 年，超出时截断（同 ZipInfo.from_file）"""
+    date_time = datetime.fromtimestamp(mtime).timetuple()[:6]
+    if date_time[0] < 1980:
+        return 1980, 1, 1, 0, 0, 0
+    if date_time[0] > 2107:
+        return 2107, 12, 31, 23, 59, 59
+    return date_time
+
+
+def _read_file(path, chunk_size):
+    with open(path, 'rb') as f:
+        while True:
+            chunk = f.read(chunk_size)
+            if not chunk:
+                return
+            yield chunk
+
+
+def zip_stream(members, compression=zipfile.ZIP_STORED, chunk_size=1 << 16):
+    """按块产出 ZIP 内容。
+
+    members 为 (包内文件名, 源, 修改时间) 序列：源是文件路径，或产出 bytes 的可迭代对象（如编码器输出）。
+    包内时间一律取 members 给出的修改时间（秒，取自原始录音），不用源文件自身的 mtime——
+    转码缓存文件的 mtime 会随 LRU 访问更新。路径成员超过 4GB 时自动使用 ZIP64。
+    内存占用只与 chunk_size 有关；中途断开时生成器被关闭，已打开的源随之关闭。
+    """
+    buf = _StreamBuffer()
+    with zipfile.ZipFile(buf, 'w', compression=compression, allowZip64=True) as zf:
+        for arcname, source, mtime in members:
+            info = zipfile.ZipInfo(arcname, _date_time(mtime))
+            if isinstance(source, (str, bytes)) or hasattr(source, '__fspath__'):
+                st = os.stat(source)
+                info.external_attr = (st.st_mode & 0xFFFF) << 16
+                # 已知大小，超过 4GB 时 zipfile 据此写 ZIP64 头
+                info.file_size = st.st_size
+                chunks = _read_file(source, chunk_size)
+            else:
+                chunks = source
+            info.compress_type = compression
+            yield from _write_member(zf, buf, info, chunks)
+            data = buf.drain()
+            if data:
+                yield data
+    # 中央目录在关闭时写出
+    yield buf.drain()
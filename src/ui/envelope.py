@@ -0,0 +1,45 @@
+"""波形包络 - 实时波形与录音波形共用的向量化 min/max 降采样与填充绘制"""
+
+import numpy as np
+import pyqtgraph as pg
+
+
+def minmax_envelope(lo, points, hi=None):
+    """把序列按等长分组降到不超过 points 组，返回 (mins, maxs, 每组样本数)。
+
+    lo/hi 分别取每组最小/最大值；原始样本两者相同（hi 省略），已是包络的数据
+    分别传下沿与上沿。整组部分用 reshape 一次归约，不足一组的尾部单独成组，
+    因此短促的瞬态不会像按步长抽点那样被跳过。
+    """
+    if hi is None:
+        hi = lo
+    n = len(lo)
+    if n == 0:
+        return lo[:0], hi[:0], 1
+    bucket = -(-n // points)
+    if bucket <= 1:
+        return lo, hi, 1
+    full = n - n % bucket
+    mins = lo[:full].reshape(-1, bucket).min(axis=1)
+    maxs = hi[:full].reshape(-1, bucket).max(axis=1)
+    if full < n:
+        mins = np.append(mins, lo[full:].min())
+        maxs = np.append(maxs, hi[full:].max())
+    return mins, maxs, bucket
+
+
+def add_envelope_curves(plot_widget, color, width=1.0, fill_alpha=110):
+    """在绘图上添加上下沿两条曲线及其间的填充，返回 (upper, lower)"""
+    pen = pg.mkPen(color, width=width)
+    upper = plot_widget.plot([], [], pen=pen)
+    lower = plot_widget.plot([], [], pen=pen)
+    fill_color = pg.mkColor(color)
+    fill_color.setAlpha(fill_alpha)
+    plot_widget.addItem(pg.FillBetweenItem(upper, lower, brush=pg.mkBrush(fill_color)))
+    return upper, lower
+
+
+def set_envelope(curves, x, mins, maxs):
+    upper, lower = curves
+    upper.setData(x, maxs)
+    lower.setData(x, mins)
@@ -2,7 +2,7 @@
 
 import numpy as np
 from PySide6.QtWidgets import QWidget, QHBoxLayout, QLabel
-from PySide6.QtCore import Qt
+from PySide6.QtCore import Qt, QTimer
 from PySide6.QtGui import QPainter, QColor, QPen
 
 from config import DARK_THEME
@@ -32,44 +32,63 @@ class AudioLevelMeter(QWidget):
         self.peak_hold_time = 0
         self.current_db = -60
 
-    def update_level(self, audio_data):
+        # 抽头轮询（~30fps），与音频线程解耦
+        self._tap = None
+        self._tap_pos = 0
+        self._timer = QTimer(self)
+        self._timer.timeout.connect(self._poll_tap)
+
+    def attach_tap(self, tap):
+        """绑定引擎的可视化抽头并开始按定时器刷新"""
+        self._tap = tap
+        self._tap_pos = tap.level_position
+        self._timer.start(33)
+
+    def _poll_tap(self):
         try:
-            if isinstance(audio_data, bytes):
-                audio_array = np.frombuffer(audio_data, dtype=np.int16).astype(np.float32) / 32768.0
-            elif isinstance(audio_data, np.ndarray):
-                audio_array = audio_data
-            else:
-                return
-            if len(audio_array) == 0:
+            rms, peak, self._tap_pos = self._tap.read_levels(self._tap_pos)
+            if len(rms) == 0:
+                # 没有新数据（无人发送）时让电平自然回落
+                if self.level > 0.001 or self.peak_level > 0.001:
+                    self._apply(None, None)
                 return
-
-            rms = np.sqrt(np.mean(audio_array ** 2))
-            db = 20 * np.log10(rms + 1e-10)
-            db = np.clip(db, -60, 0)
-            normalized = (db + 60) / 60
-
-            self.level = self.level * 0.7 + normalized * 0.3
-            self.current_db = db
-
-            if normalized > self.peak_level:
-                self.peak_level = normalized
-                self.peak_hold_time = 20
-            else:
-                self.peak_hold_time -= 1
-                if self.peak_hold_time <= 0:
-                    self.peak_level *= 0.95
-
-            if db <= -59:
-                self._db_label.setText("-∞ dB")
-            else:
-                self._db_label.setText(f"{db:.1f} dB")
-
-            self._canvas.level = self.level
-            self._canvas.peak_level = self.peak_level
-            self._canvas.update()
+            # 一个刷新周期内可能有多包，取其中最大值
+            self._apply(float(rms.max()), float(peak.max()))
         except Exception:
             pass
 
+    @staticmethod
+    def _normalize(value):
+        db = float(np.clip(20 * np.log10(value + 1e-10), -60, 0))
+        return db, (db + 60) / 60
+
+    def _apply(self, rms, peak):
+        if rms is None:
+            db, normalized, peak_normalized = -60, 0.0, 0.0
+        else:
+            db, normalized = self._normalize(rms)
+            peak_normalized = self._normalize(peak)[1]
+
+        self.level = self.level * 0.7 + normalized * 0.3
+        self.current_db = db
+
+        if peak_normalized > self.peak_level:
+            self.peak_level = peak_normalized
+            self.peak_hold_time = 20
+        else:
+            self.peak_hold_time -= 1
+            if self.peak_hold_time <= 0:
+                self.peak_level *= 0.95
+
+        if db <= -59:
+            self._db_label.setText("-∞ dB")
+        else:
+            self._db_label.setText(f"{db:.1f} dB")
+
+        self._canvas.level = self.level
+        self._canvas.peak_level = self.peak_level
+        self._canvas.update()
+
     def reset(self):
         self.level = 0.0
         self.peak_level = 0.0
@@ -28,14 +28,16 @@ from flask_socketio import SocketIO
 
 from config import (
     APP_VERSION, WINDOW_TITLE, WINDOW_WIDTH, WINDOW_HEIGHT, WINDOW_MIN_WIDTH, WINDOW_MIN_HEIGHT,
-    CONFIG_FILE_NAME, LOG_FILE_NAME, CERT_FILE_NAME, KEY_FILE_NAME, RECORD_DIR,
-    DEFAULT_PORT, MIN_PORT, MAX_PORT, FORMAT_FLOAT32,
-    ENABLE_LOG_FILE, ENABLE_REALTIME_PLAYBACK, DARK_THEME,
+    CONFIG_FILE_NAME, LOG_FILE_NAME, CERT_FILE_NAME, KEY_FILE_NAME, RECORD_DIR, TRANSCODE_CACHE_DIR_NAME,
+    DEFAULT_PORT, MIN_PORT, MAX_PORT, FORMAT_FLOAT32, OUTPUT_TARGET_LATENCY_MS, OUTPUT_ADAPTIVE_LATENCY,
+    ENABLE_LOG_FILE, ENABLE_REALTIME_PLAYBACK, RECORD_MULTITRACK, AUDIO_WS_ENABLED, DARK_THEME,
     get_default_record_dir
 )
-from audio import AudioEngine, AudioPlayer
+from audio import AudioEngine, AudioPlayer, RecordingCatalog, TranscodeCache, recover_recordings
+from audio.transcode import write_int16
 from server.cert import generate_cert
 from server.routes import register_routes
+from server.audio_ws import wrap_audio_ws
 from ui.level_meter import AudioLevelMeter
 from ui.waveform import WaveformVisualizer
 from ui.realtime_waveform import RealtimeWaveformVisualizer
@@ -117,6 +119,7 @@ class MainWindow(QMainWindow):
         self.server_sock = None
         self.broadcast_queue = queue.Queue()
         self.recording_start_time = 0
+        self._record_ts = None
 
         # 加载配置
         self.config = self._load_config()
@@ -128,6 +131,8 @@ class MainWindow(QMainWindow):
         else:
             self.record_dir = get_default_record_dir()
         self.record_dir.mkdir(parents=True, exist_ok=True)
+        self.catalog = RecordingCatalog(self.record_dir, self.log_message)
+        self.transcode_cache = TranscodeCache(self.config_dir / TRANSCODE_CACHE_DIR_NAME, log_callback=self.log_message)
 
         # 构建 UI
         self._setup_ui()
@@ -137,6 +142,9 @@ class MainWindow(QMainWindow):
 
         # 初始化
         self._refresh_devices()
+        # 修复残缺录音需逐个打开文件，放到后台线程；文件在此先列出，之后开始的录音不受影响
+        threading.Thread(target=recover_recordings, daemon=True,
+                         args=(self.record_dir, self.log_message, sorted(self.record_dir.glob("REC_*.wav")))).start()
         self._load_existing_records()
 
         self.log_message("程序初始化完成 (空格: 播放/暂停, 左右键: 快进/快退)", "INFO")
@@ -252,6 +260,23 @@ class MainWindow(QMainWindow):
         port_row.addWidget(self.btn_server)
         left_layout.addLayout(port_row)
 
+        # 输出缓冲：目标延迟 + 欠载/溢出统计
+        buffer_row = QHBoxLayout()
+        buffer_row.addWidget(QLabel("输出缓冲:"))
+        self.combo_latency = QComboBox()
+        self.combo_latency.addItems(["自动", "20", "40", "60", "100", "200"])
+        saved_latency = self.config.get("output_latency_ms", "auto" if OUTPUT_ADAPTIVE_LATENCY else OUTPUT_TARGET_LATENCY_MS)
+        self.combo_latency.setCurrentText("自动" if saved_latency == "auto" else str(saved_latency))
+        self.combo_latency.currentTextChanged.connect(self._on_latency_changed)
+        self.combo_latency.setFixedWidth(70)
+        buffer_row.addWidget(self.combo_latency)
+        buffer_row.addWidget(QLabel("ms"))
+        self.lbl_output_stats = QLabel("")
+        self.lbl_output_stats.setStyleSheet(f"color: {DARK_THEME['text_secondary']}; font-family: Consolas; font-size: 11px;")
+        buffer_row.addWidget(self.lbl_output_stats)
+        buffer_row.addStretch()
+        left_layout.addLayout(buffer_row)
+
         # 实时波形（控制和画布在同一行）
         wf_group = QGroupBox("实时音频波形")
         wf_layout = QHBoxLayout(wf_group)
@@ -285,7 +310,9 @@ class MainWindow(QMainWindow):
         initial_dur = self.config.get("waveform_duration", 10)
         self.realtime_waveform = RealtimeWaveformVisualizer(log_callback=self.log_message, duration_seconds=initial_dur)
         wf_layout.addWidget(self.realtime_waveform, stretch=1)
-        self.audio_engine.waveform_callback = self._update_realtime_waveform
+        # 波形与电平表各自用定时器从引擎的可视化抽头取数据，音频线程不回调界面
+        self.realtime_waveform.attach_tap(self.audio_engine.visual_tap)
+        self.level_meter.attach_tap(self.audio_engine.visual_tap)
         left_layout.addWidget(wf_group)
 
         # QR 码 + 地址列表
@@ -322,6 +349,11 @@ class MainWindow(QMainWindow):
         self.lbl_rec_time.setStyleSheet("font-family: Consolas; font-size: 14px;")
         rec_ctrl.addWidget(self.lbl_rec_time)
         rec_ctrl.addStretch()
+        self.chk_multitrack = QCheckBox("分轨录制")
+        self.chk_multitrack.setToolTip("多台手机同时录制时，每台手机额外保存一个独立音轨 (_T1/_T2...)")
+        self.chk_multitrack.setChecked(self.config.get("record_multitrack", RECORD_MULTITRACK))
+        self.chk_multitrack.stateChanged.connect(self._on_multitrack_changed)
+        rec_ctrl.addWidget(self.chk_multitrack)
         right_layout.addLayout(rec_ctrl)
 
         right_layout.addWidget(QLabel("录音记录 (双击播放):"))
@@ -425,6 +457,13 @@ class MainWindow(QMainWindow):
         # 同步音频引擎状态
         self.audio_engine.enable_monitor_playback = self.chk_monitor.isChecked()
         self.audio_engine.enable_virtual_mic_output = self.chk_vmic.isChecked()
+        self.audio_engine.record_multitrack = self.chk_multitrack.isChecked()
+        self._on_latency_changed(self.combo_latency.currentText())
+
+        # 输出缓冲统计刷新
+        self._stats_timer = QTimer(self)
+        self._stats_timer.timeout.connect(self._update_output_stats)
+        self._stats_timer.start(1000)
 
     # ==================== 配置管理 ====================
 
@@ -446,6 +485,7 @@ class MainWindow(QMainWindow):
             "waveform_duration": 10,
             "delete_to_trash": True,
             "enable_realtime_playback": ENABLE_REALTIME_PLAYBACK,
+            "output_latency_ms": "auto" if OUTPUT_ADAPTIVE_LATENCY else OUTPUT_TARGET_LATENCY_MS,
         }
 
     def _save_config(self):
@@ -550,6 +590,29 @@ class MainWindow(QMainWindow):
         self._save_config()
         self.log_message(f"虚拟麦克风{'已启用' if enabled else '已禁用'}", "INFO")
 
+    def _on_latency_changed(self, text):
+        if text == "自动":
+            self.audio_engine.set_target_latency(None)
+            self.config["output_latency_ms"] = "auto"
+        else:
+            try:
+                latency_ms = int(text)
+            except ValueError:
+                return
+            self.audio_engine.set_target_latency(latency_ms)
+            self.config["output_latency_ms"] = latency_ms
+        self._save_config()
+
+    def _update_output_stats(self):
+        stats = self.audio_engine.get_latency_stats()
+        if not stats:
+            self.lbl_output_stats.setText("")
+            return
+        self.lbl_output_stats.setText(
+            f"延迟 ~{stats['total_ms']:.0f}ms · 缓冲 {stats['buffer_ms']:.0f}ms · "
+            f"欠载 {stats['underruns']} · 溢出 {stats['overruns']}"
+        )
+
     # ==================== 网络 ====================
 
     def _get_local_ip(self):
@@ -583,6 +646,7 @@ class MainWindow(QMainWindow):
         """构建路由上下文并注册"""
         ctx = _RouteContext(self)
         register_routes(ctx)
+        self.wsgi_app = wrap_audio_ws(ctx, self.flask_app) if AUDIO_WS_ENABLED else self.flask_app
 
     # ==================== 服务器控制 ====================
 
@@ -700,7 +764,7 @@ class MainWindow(QMainWindow):
                         wsgi_logger.setLevel(logging.CRITICAL)
 
                         self.socketio.start_background_task(self._bg_emit_loop)
-                        eventlet.wsgi.server(ssl_sock, self.flask_app, log_output=False)
+                        eventlet.wsgi.server(ssl_sock, self.wsgi_app, log_output=False)
                     finally:
                         # 恢复原始 stderr
                         sys.stderr = original_stderr
@@ -769,6 +833,7 @@ class MainWindow(QMainWindow):
 
     def _bg_emit_loop(self):
         self.log_message("后台广播服务已启动", "DEBUG")
+        last_stats_time = 0
         while self.is_server_running:
             try:
                 try:
@@ -777,6 +842,13 @@ class MainWindow(QMainWindow):
                         self.socketio.emit('recording_status', msg['data'], namespace='/')
                 except queue.Empty:
                     pass
+                # 每秒向手机推送一次实测延迟
+                now = time.time()
+                if self.mic_active_clients and now - last_stats_time >= 1.0:
+                    last_stats_time = now
+                    stats = self.audio_engine.get_latency_stats()
+                    if stats:
+                        self.socketio.emit('latency_stats', stats, namespace='/')
                 self.socketio.sleep(0.1)
             except Exception as e:
                 print(f"Broadcast loop error: {e}")
@@ -799,7 +871,7 @@ class MainWindow(QMainWindow):
             QMessageBox.warning(self, "提示", "无可用麦克风！\n请先在手机端点击「开启麦克风」后再开始录制。")
             return
         self.is_recording = True
-        self.audio_engine.start_recording()
+        self._begin_recording()
         self.btn_rec.setText("停止录制")
         self.btn_rec.setStyleSheet(f"background-color: {DARK_THEME['warning']}; color: #000; font-weight: bold;")
         self.recording_start_time = time.time()
@@ -808,11 +880,26 @@ class MainWindow(QMainWindow):
 
     def _stop_recording(self):
         self.is_recording = False
-        frames, data_format, sample_rate = self.audio_engine.stop_recording()
         self.btn_rec.setText("开始录制")
         self.btn_rec.setStyleSheet(f"background-color: {DARK_THEME['danger']}; color: #fff; font-weight: bold;")
         self._broadcast_recording_status()
-        if frames:
+        self._finish_recording()
+
+    def _begin_recording(self):
+        """录制开始时即确定文件名，流式录音直接写入该文件"""
+        self._record_ts = datetime.now().strftime("%Y%m%d_%H%M%S")
+        suffix = "_32bit" if self.audio_engine.recording_format == FORMAT_FLOAT32 else ""
+        filepath = self.record_dir / f"REC_{self._record_ts}{suffix}.wav"
+        self.audio_engine.start_recording(str(filepath))
+
+    def _finish_recording(self):
+        frames, data_format, sample_rate = self.audio_engine.stop_recording()
+        saved_path = self.audio_engine.last_saved_path
+        for track_path in self.audio_engine.last_track_paths:
+            self._add_file_to_list(Path(track_path).name, self._record_ts)
+        if saved_path:
+            self._add_file_to_list(Path(saved_path).name, self._record_ts)
+        elif frames:
             ts = datetime.now().strftime("%Y%m%d_%H%M%S")
             suffix = "_32bit" if data_format == FORMAT_FLOAT32 else ""
             filename = f"REC_{ts}{suffix}.wav"
@@ -832,7 +919,7 @@ class MainWindow(QMainWindow):
                 self._broadcast_recording_status()
                 return
             self.is_recording = True
-            self.audio_engine.start_recording()
+            self._begin_recording()
             self.btn_rec.setText("停止录制")
             self.btn_rec.setStyleSheet(f"background-color: {DARK_THEME['warning']}; color: #000; font-weight: bold;")
             self.recording_start_time = time.time()
@@ -840,16 +927,9 @@ class MainWindow(QMainWindow):
             self.log_message("手机端触发开始录制", "SUCCESS")
         else:
             self.is_recording = False
-            frames, data_format, sample_rate = self.audio_engine.stop_recording()
             self.btn_rec.setText("开始录制")
             self.btn_rec.setStyleSheet(f"background-color: {DARK_THEME['danger']}; color: #fff; font-weight: bold;")
-            if frames:
-                ts = datetime.now().strftime("%Y%m%d_%H%M%S")
-                suffix = "_32bit" if data_format == FORMAT_FLOAT32 else ""
-                filename = f"REC_{ts}{suffix}.wav"
-                filepath = self.record_dir / filename
-                if self.audio_engine.save_wav(frames, str(filepath), data_format, sample_rate):
-                    self._add_file_to_list(filename, ts)
+            self._finish_recording()
             self.log_message("手机端触发停止录制", "SUCCESS")
         self._broadcast_recording_status()
 
@@ -883,6 +963,7 @@ class MainWindow(QMainWindow):
 
     def on_disconnect(self, remote_addr, sid):
         self.connected_clients = max(0, self.connected_clients - 1)
+        self.audio_engine.remove_source(sid)
         if sid in self.mic_active_clients:
             self.mic_active_clients.discard(sid)
             self.schedule_ui(self._update_rec_button_state)
@@ -899,6 +980,7 @@ class MainWindow(QMainWindow):
             self.log_message(f"客户端 {sid} 麦克风已开启 (活跃: {len(self.mic_active_clients)})", "SUCCESS")
         else:
             self.mic_active_clients.discard(sid)
+            self.audio_engine.remove_source(sid)
             self.log_message(f"客户端 {sid} 麦克风已关闭 (活跃: {len(self.mic_active_clients)})", "WARNING")
         self.schedule_ui(self._update_rec_button_state)
 
@@ -974,14 +1056,14 @@ class MainWindow(QMainWindow):
                 self.play_update_timer.stop()
 
     def _on_progress_change(self, value):
-        if self.audio_player.wav_file or hasattr(self.audio_player, 'float32_file'):
+        if self.audio_player.is_loaded:
             progress = value / 1000.0
             target = int(progress * self.audio_player.total_frames)
             self.audio_player.seek(target)
             self.waveform_viz.update_play_position(progress)
 
     def _on_waveform_click(self, progress):
-        if self.audio_player.wav_file or hasattr(self.audio_player, 'float32_file'):
+        if self.audio_player.is_loaded:
             self.slider_progress.blockSignals(True)
             self.slider_progress.setValue(int(progress * 1000))
             self.slider_progress.blockSignals(False)
@@ -995,24 +1077,29 @@ class MainWindow(QMainWindow):
 
     def _load_existing_records(self):
         try:
-            wav_files = sorted(self.record_dir.glob("*.wav"), key=lambda x: x.stat().st_mtime, reverse=True)
-            for wf in wav_files:
-                filename = wf.name
+            entries = self.catalog.entries()
+            for entry in entries:
+                filename = entry.name
                 if filename.startswith("REC_") and len(filename) >= 19:
                     ts_str = filename[4:19]
                     try:
                         ft = datetime.strptime(ts_str, "%Y%m%d_%H%M%S").strftime("%Y-%m-%d %H:%M:%S")
                     except:
-                        ft = datetime.fromtimestamp(wf.stat().st_mtime).strftime("%Y-%m-%d %H:%M:%S")
+                        ft = datetime.fromtimestamp(entry.mtime).strftime("%Y-%m-%d %H:%M:%S")
                 else:
-                    ft = datetime.fromtimestamp(wf.stat().st_mtime).strftime("%Y-%m-%d %H:%M:%S")
+                    ft = datetime.fromtimestamp(entry.mtime).strftime("%Y-%m-%d %H:%M:%S")
                 self.file_tree.addTopLevelItem(QTreeWidgetItem([filename, ft]))
-            if wav_files:
-                self.log_message(f"已加载 {len(wav_files)} 个录音文件", "INFO")
+            if entries:
+                self.log_message(f"已加载 {len(entries)} 个录音文件", "INFO")
         except Exception as e:
             self.log_message(f"加载录音文件失败: {e}", "ERROR")
 
     def _add_file_to_list(self, name, timestamp):
+        filepath = self.record_dir / name
+        entry = self.catalog.update(filepath)
+        # 浮点录音手机端须转码才能播放，保存后即在后台生成缓存
+        if entry is not None and entry.format and entry.format.startswith("float"):
+            self.transcode_cache.prepare_async(filepath, write_int16(filepath))
         ft = datetime.strptime(timestamp, "%Y%m%d_%H%M%S").strftime("%Y-%m-%d %H:%M:%S")
         self.file_tree.insertTopLevelItem(0, QTreeWidgetItem([name, ft]))
 
@@ -1068,6 +1155,7 @@ class MainWindow(QMainWindow):
         self.record_dir.mkdir(parents=True, exist_ok=True)
         self.config["record_dir"] = str(self.record_dir)
         self._save_config()
+        self.catalog.set_directory(self.record_dir)
         self.file_tree.clear()
         self._load_existing_records()
         self.log_message(f"录制目录已更改为: {self.record_dir}", "SUCCESS")
@@ -1087,6 +1175,14 @@ class MainWindow(QMainWindow):
             except Exception as e:
                 self.log_message(f"另存为失败: {e}", "ERROR")
 
+    def _on_multitrack_changed(self):
+        enabled = self.chk_multitrack.isChecked()
+        self.audio_engine.record_multitrack = enabled
+        self.config["record_multitrack"] = enabled
+        self._save_config()
+        if self.is_recording:
+            self.log_message("分轨录制设置将在下次录制时生效", "INFO")
+
     def _on_trash_changed(self):
         self.config["delete_to_trash"] = self.chk_trash.isChecked()
         self._save_config()
@@ -1112,12 +1208,6 @@ class MainWindow(QMainWindow):
         except ValueError:
             pass
 
-    def _update_realtime_waveform(self, audio_data):
-        if self.realtime_waveform and self.chk_realtime_wf.isChecked():
-            self.realtime_waveform.update_data(audio_data)
-        if hasattr(self, 'level_meter'):
-            self.level_meter.update_level(audio_data)
-
     # ==================== QR 码 ====================
 
     def _update_qr_code(self, url):
@@ -1170,7 +1260,7 @@ class MainWindow(QMainWindow):
     # ==================== 快捷键 ====================
 
     def keyPressEvent(self, event):
-        if not self.audio_player.wav_file and not hasattr(self.audio_player, 'float32_file'):
+        if not self.audio_player.is_loaded:
             return super().keyPressEvent(event)
 
         key = event.key()
@@ -1200,6 +1290,7 @@ class MainWindow(QMainWindow):
             self.audio_player.stop()
         self.audio_engine.close()
         self.audio_player.close()
+        self.catalog.close()
         self._save_config()
         event.accept()
         os._exit(0)
@@ -1219,6 +1310,14 @@ class _RouteContext:
     def record_dir(self):
         return self._win.record_dir
 
+    @property
+    def catalog(self):
+        return self._win.catalog
+
+    @property
+    def transcode_cache(self):
+        return self._win.transcode_cache
+
     @property
     def is_recording(self):
         return self._win.is_recording
@@ -5,17 +5,23 @@ import pyqtgraph as pg
 from PySide6.QtWidgets import QWidget, QVBoxLayout
 from PySide6.QtCore import QTimer
 
+from config import RATE, TAP_DECIMATION
+from .envelope import minmax_envelope, add_envelope_curves, set_envelope
+
 
 class RealtimeWaveformVisualizer(QWidget):
     def __init__(self, parent=None, log_callback=None, duration_seconds=10):
         super().__init__(parent)
         self.log = log_callback or (lambda m, l: None)
-        self.sample_rate = 44100
+        self.sample_rate = RATE
         self.duration_seconds = duration_seconds
-        self.buffer_size = self.sample_rate * self.duration_seconds
-        self.waveform_buffer = np.zeros(self.buffer_size)
+        # 环形缓冲存抽头发布的包络，每行一组 (max, min)；_write_pos 指向最旧的一行
+        self.buffer_size = self._envelope_size(duration_seconds)
+        self._reset_buffer()
         self.display_points = 2000
         self.is_running = False
+        self._tap = None
+        self._tap_pos = 0
 
         # 布局
         layout = QVBoxLayout(self)
@@ -33,79 +39,95 @@ class RealtimeWaveformVisualizer(QWidget):
         # 零线
         self.plot_widget.addLine(y=0, pen=pg.mkPen('#7f8c8d', width=1, style=pg.QtCore.Qt.DashLine))
 
-        # 波形曲线
-        time_axis = np.linspace(-self.duration_seconds, 0, self.display_points)
-        self.curve = self.plot_widget.plot(time_axis, np.zeros(self.display_points),
-                                           pen=pg.mkPen('#3498db', width=1.5))
+        # 波形包络（上下沿 + 填充）
+        self.curves = add_envelope_curves(self.plot_widget, '#3498db')
+        self._clear_plot()
         layout.addWidget(self.plot_widget)
 
         # 刷新定时器 (~30fps)
         self._timer = QTimer(self)
         self._timer.timeout.connect(self._update_plot)
 
-    def _downsample_for_display(self, data):
-        if len(data) <= self.display_points:
-            return data
-        chunk_size = len(data) // self.display_points
-        result = np.empty(self.display_points)
-        for i in range(self.display_points):
-            start = i * chunk_size
-            end = start + chunk_size
-            chunk = data[start:end]
-            if len(chunk) > 0:
-                result[i] = np.max(chunk) if i % 2 == 0 else np.min(chunk)
-            else:
-                result[i] = 0
-        return result
+    def _envelope_size(self, duration_seconds):
+        return int(duration_seconds * self.sample_rate / TAP_DECIMATION)
+
+    def _reset_buffer(self):
+        self.waveform_buffer = np.zeros((self.buffer_size, 2), dtype=np.float32)
+        self._render_buffer = np.empty_like(self.waveform_buffer)
+        self._write_pos = 0
+
+    def _append(self, maxs, mins):
+        """写入新包络，开销只与新数据量有关，与历史时长无关"""
+        size = self.buffer_size
+        n = len(maxs)
+        if n >= size:
+            self.waveform_buffer[:, 0] = maxs[-size:]
+            self.waveform_buffer[:, 1] = mins[-size:]
+            self._write_pos = 0
+            return
+        pos = self._write_pos
+        first = min(n, size - pos)
+        self.waveform_buffer[pos:pos + first, 0] = maxs[:first]
+        self.waveform_buffer[pos:pos + first, 1] = mins[:first]
+        if first < n:
+            self.waveform_buffer[:n - first, 0] = maxs[first:]
+            self.waveform_buffer[:n - first, 1] = mins[first:]
+        self._write_pos = (pos + n) % size
+
+    def _ordered(self):
+        """按时间顺序取出历史（两段拷贝到复用的绘制缓冲），每行 (max, min)"""
+        pos = self._write_pos
+        tail = self.buffer_size - pos
+        self._render_buffer[:tail] = self.waveform_buffer[pos:]
+        self._render_buffer[tail:] = self.waveform_buffer[:pos]
+        return self._render_buffer
+
+    def attach_tap(self, tap):
+        """绑定引擎的可视化抽头，刷新定时器从中取包络"""
+        self._tap = tap
+        self._tap_pos = tap.envelope_position
+
+    def _clear_plot(self):
+        flat = np.zeros(2)
+        set_envelope(self.curves, np.array([-self.duration_seconds, 0.0]), flat, flat)
 
     def set_duration(self, duration_seconds):
         if duration_seconds == self.duration_seconds:
             return
         old = self.duration_seconds
         self.duration_seconds = duration_seconds
-        self.buffer_size = self.sample_rate * duration_seconds
-        self.waveform_buffer = np.zeros(self.buffer_size)
+        self.buffer_size = self._envelope_size(duration_seconds)
+        self._reset_buffer()
         self.plot_widget.setXRange(-duration_seconds, 0)
-        time_axis = np.linspace(-duration_seconds, 0, self.display_points)
-        self.curve.setData(time_axis, np.zeros(self.display_points))
+        self._clear_plot()
         self.log(f"实时波形历史时长已调整: {old}s → {duration_seconds}s", "INFO")
 
-    def update_data(self, audio_data):
-        try:
-            if isinstance(audio_data, bytes):
-                audio_array = np.frombuffer(audio_data, dtype=np.int16).astype(np.float32) / 32768.0
-            elif isinstance(audio_data, np.ndarray):
-                audio_array = audio_data
-            else:
-                return
-            if len(audio_array) > self.buffer_size:
-                audio_array = audio_array[-self.buffer_size:]
-            shift = len(audio_array)
-            self.waveform_buffer = np.roll(self.waveform_buffer, -shift)
-            self.waveform_buffer[-shift:] = audio_array
-        except Exception:
-            pass
+    def _pull_tap(self):
+        """取出上次刷新以来抽头新发布的包络，追加到历史缓冲"""
+        mins, maxs, self._tap_pos = self._tap.read_envelope(self._tap_pos)
+        if len(mins):
+            self._append(maxs, mins)
 
     def _update_plot(self):
         if self.is_running:
-            display_data = self._downsample_for_display(self.waveform_buffer)
-            self.curve.setData(
-                np.linspace(-self.duration_seconds, 0, self.display_points),
-                display_data
-            )
+            if self._tap is not None:
+                self._pull_tap()
+            rows = self._ordered()
+            mins, maxs, _ = minmax_envelope(rows[:, 1], self.display_points, hi=rows[:, 0])
+            set_envelope(self.curves, np.linspace(-self.duration_seconds, 0, len(mins)), mins, maxs)
 
     def start(self):
         if not self.is_running:
             self.is_running = True
+            # 只显示启动之后的数据，停止期间抽头积累的旧包络不再补画
+            if self._tap is not None:
+                self._tap_pos = self._tap.envelope_position
             self._timer.start(33)  # ~30fps
             self.log("实时波形显示已启动", "INFO")
 
     def stop(self):
         self._timer.stop()
         self.is_running = False
-        self.waveform_buffer = np.zeros(self.buffer_size)
-        self.curve.setData(
-            np.linspace(-self.duration_seconds, 0, self.display_points),
-            np.zeros(self.display_points)
-        )
+        self._reset_buffer()
+        self._clear_plot()
         self.log("实时波形显示已停止", "INFO")
@@ -1,13 +1,14 @@
 """录音波形可视化组件（pyqtgraph，支持点击跳转和拖动）"""
 
-import wave
-import struct
 import numpy as np
 import pyqtgraph as pg
 from PySide6.QtWidgets import QWidget, QVBoxLayout
 from PySide6.QtCore import Qt, QTimer
 
 from config import RATE
+from audio.peaks import load_or_build_peaks
+from audio.wavfile import memmap_mono, to_float
+from .envelope import minmax_envelope, add_envelope_curves, set_envelope
 
 
 class WaveformVisualizer(QWidget):
@@ -17,6 +18,8 @@ class WaveformVisualizer(QWidget):
         self.click_callback = click_callback
 
         self.waveform_data = None
+        self.peaks = None
+        self._filepath = None
         self.sample_rate = RATE
         self.total_duration = 0
         self.current_progress = 0.0
@@ -34,8 +37,8 @@ class WaveformVisualizer(QWidget):
         self.plot_widget.setLabel('left', 'Amplitude', color='white', size='9pt')
         self.plot_widget.showGrid(x=True, y=True, alpha=0.2)
 
-        # 波形曲线
-        self.curve = self.plot_widget.plot([], [], pen=pg.mkPen('#3498db', width=0.8))
+        # 波形包络（上下沿 + 填充）
+        self.curves = add_envelope_curves(self.plot_widget, '#3498db', width=0.8)
 
         # 播放位置指示线
         self.play_line = pg.InfiniteLine(pos=0, angle=90,
@@ -53,13 +56,19 @@ class WaveformVisualizer(QWidget):
 
         layout.addWidget(self.plot_widget)
 
+        # 视图范围变化（缩放/平移）后按当前分辨率重取峰值，合并连续的变化
+        self._lod_timer = QTimer(self)
+        self._lod_timer.setSingleShot(True)
+        self._lod_timer.timeout.connect(self._refresh_view)
+        self.plot_widget.sigXRangeChanged.connect(lambda *_: self._lod_timer.start(30))
+
         # 动画定时器 (~60fps)
         self._anim_timer = QTimer(self)
         self._anim_timer.timeout.connect(self._animate_position)
         self.is_animating = False
 
     def _on_click(self, event):
-        if self.waveform_data is None or self.total_duration == 0:
+        if self.peaks is None or self.total_duration == 0:
             return
         # 只处理左键
         if event.button() != Qt.LeftButton:
@@ -80,7 +89,7 @@ class WaveformVisualizer(QWidget):
             self.click_callback(progress)
 
     def _on_line_dragged(self):
-        if self.waveform_data is None or self.total_duration == 0:
+        if self.peaks is None or self.total_duration == 0:
             return
         # 程序化移动不触发拖动逻辑
         if self._programmatic_move:
@@ -99,42 +108,20 @@ class WaveformVisualizer(QWidget):
 
     def load_waveform(self, filepath):
         try:
-            try:
-                with wave.open(filepath, 'rb') as wf:
-                    frames = wf.readframes(wf.getnframes())
-                    self.sample_rate = wf.getframerate()
-                    sample_width = wf.getsampwidth()
-                    if sample_width == 2:
-                        data = np.frombuffer(frames, dtype=np.int16)
-                        self.waveform_data = data.astype(np.float32) / 32768.0
-                    elif sample_width == 4:
-                        data = np.frombuffer(frames, dtype=np.float32)
-                        if np.max(np.abs(data)) <= 2.0:
-                            self.waveform_data = data
-                        else:
-                            data = np.frombuffer(frames, dtype=np.int32)
-                            self.waveform_data = data.astype(np.float32) / 2147483648.0
-                    elif sample_width == 1:
-                        data = np.frombuffer(frames, dtype=np.uint8)
-                        self.waveform_data = (data.astype(np.float32) - 128) / 128.0
-                    else:
-                        raise ValueError(f"不支持的样本宽度: {sample_width} bytes")
-            except wave.Error:
-                self.waveform_data, self.sample_rate = self._load_float32_wav(filepath)
-
-            if self.waveform_data is None or len(self.waveform_data) == 0:
+            self.waveform_data = None
+            self._filepath = filepath
+            # 峰值金字塔：有效的 .peaks 旁路文件（录音时生成）直接读取，不读音频数据；
+            # 否则从内存映射的样本生成一次并写到 WAV 旁边
+            self.peaks = load_or_build_peaks(filepath, self._samples_with_rate)
+            if self.peaks.total_frames == 0:
                 raise ValueError("波形数据为空")
+            self.sample_rate = self.peaks.sample_rate
+            self.total_duration = self.peaks.total_frames / self.sample_rate
 
-            # 降采样显示
-            target_points = 10000
-            factor = max(1, len(self.waveform_data) // target_points)
-            display_data = self.waveform_data[::factor]
-            self.total_duration = len(self.waveform_data) / self.sample_rate
-            time_axis = np.arange(len(display_data)) * factor / self.sample_rate
-
-            self.curve.setData(time_axis, display_data)
-            self.plot_widget.setXRange(0, self.total_duration)
+            self.plot_widget.setLimits(xMin=0, xMax=self.total_duration)
+            self.plot_widget.setXRange(0, self.total_duration, padding=0)
             self.plot_widget.setYRange(-1.0, 1.0)
+            self._refresh_view()
 
             self._set_line_pos(0)
             self.play_line.setVisible(True)
@@ -144,44 +131,42 @@ class WaveformVisualizer(QWidget):
             self.log(f"波形加载成功，时长: {self.total_duration:.2f}秒", "INFO")
             return True
         except Exception as e:
+            self.peaks = None
             self.log(f"加载波形失败: {e}", "ERROR")
             return False
 
-    def _load_float32_wav(self, filepath):
-        with open(filepath, 'rb') as f:
-            riff = f.read(4)
-            if riff != b'RIFF':
-                raise ValueError("不是有效的 WAV 文件")
-            f.read(4)
-            wave_id = f.read(4)
-            if wave_id != b'WAVE':
-                raise ValueError("不是有效的 WAVE 文件")
-            sample_rate = 44100
-            audio_data = None
-            while True:
-                chunk_id = f.read(4)
-                if len(chunk_id) < 4:
-                    break
-                chunk_size = struct.unpack('<I', f.read(4))[0]
-                if chunk_id == b'fmt ':
-                    struct.unpack('<H', f.read(2))[0]  # format
-                    struct.unpack('<H', f.read(2))[0]  # channels
-                    sample_rate = struct.unpack('<I', f.read(4))[0]
-                    f.read(4)  # byte_rate
-                    f.read(2)  # block_align
-                    struct.unpack('<H', f.read(2))[0]  # bits
-                    remaining = chunk_size - 16
-                    if remaining > 0:
-                        f.read(remaining)
-                elif chunk_id == b'data':
-                    raw_data = f.read(chunk_size)
-                    audio_data = np.frombuffer(raw_data, dtype=np.float32)
-                    break
-                else:
-                    f.read(chunk_size)
-            if audio_data is None:
-                raise ValueError("未找到音频数据")
-            return audio_data, sample_rate
+    def _samples(self):
+        """原始样本的内存映射视图（类型化、未换算），只有被访问的页才会读盘"""
+        if self.waveform_data is None:
+            self.waveform_data, _ = self._samples_with_rate()
+        return self.waveform_data
+
+    def _samples_with_rate(self):
+        # 多声道文件按第一声道显示
+        self.waveform_data, rate = memmap_mono(self._filepath)
+        return self.waveform_data, rate
+
+    def _refresh_view(self):
+        """按可见范围与绘图宽度选层：每像素样本数够大时读金字塔，放大到细于首层时读原始样本"""
+        if self.peaks is None:
+            return
+        x0, x1 = self.plot_widget.viewRange()[0]
+        total = self.peaks.total_frames
+        start = max(0, int(x0 * self.sample_rate))
+        end = min(total, int(np.ceil(x1 * self.sample_rate)) + 1)
+        if end <= start:
+            return
+        points = max(1, self.plot_widget.width())
+        level = self.peaks.level_for((end - start) / points)
+        if level is not None:
+            lo, hi, offset = self.peaks.read(level, start, end)
+            mins, maxs, bucket = minmax_envelope(lo, points, hi=hi)
+            bucket *= level[0]
+        else:
+            offset = start
+            mins, maxs, bucket = minmax_envelope(to_float(self._samples()[start:end]), points)
+        time_axis = (offset + np.arange(len(mins)) * bucket) / self.sample_rate
+        set_envelope(self.curves, time_axis, mins, maxs)
 
     def _set_line_pos(self, pos):
         """程序化设置指示线位置，不触发拖动逻辑"""
@@ -190,19 +175,19 @@ class WaveformVisualizer(QWidget):
         self._programmatic_move = False
 
     def update_play_position(self, progress):
-        if self.waveform_data is None or self.total_duration == 0:
+        if self.peaks is None or self.total_duration == 0:
             return
         self.current_progress = progress
         if not self.is_dragging:
             self._set_line_pos(progress * self.total_duration)
 
     def _animate_position(self):
-        if self.waveform_data is not None and self.total_duration > 0 and not self.is_dragging:
+        if self.peaks is not None and self.total_duration > 0 and not self.is_dragging:
             new_pos = self.current_progress * self.total_duration
             self._set_line_pos(new_pos)
 
     def start_animation(self):
-        if not self.is_animating and self.waveform_data is not None:
+        if not self.is_animating and self.peaks is not None:
             self.is_animating = True
             self._anim_timer.start(16)  # ~60fps
             self.log(f"波形动画已启动 (60fps), total_duration={self.total_duration:.2f}s", "INFO")
@@ -214,7 +199,9 @@ class WaveformVisualizer(QWidget):
 
     def clear(self):
         self.stop_animation()
-        self.curve.setData([], [])
+        set_envelope(self.curves, [], [], [])
         self.play_line.setVisible(False)
+        # 释放内存映射，文件不再被占用
         self.waveform_data = None
+        self.peaks = None
         self.current_progress = 0.0